@@ -0,0 +1,97 @@
+"""
+Benchmarks process_pdf_file against the previous two-pass extraction.
+
+Usage:
+    python benchmarks/bench_extract.py [report.pdf] [--workers N] [--repeat N]
+
+Without a PDF argument a 17-page synthetic report is generated with reportlab.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import PyPDF2
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from MBTIntelligence.extract_text import process_pdf_file
+from MBTIntelligence.consts import lines_to_remove
+
+
+def make_synthetic_report(path, num_pages=17, lines_per_page=50):
+    pdf = canvas.Canvas(path, pagesize=A4)
+    for page_num in range(num_pages):
+        y = 800
+        for line_num in range(lines_per_page):
+            pdf.drawString(40, y, f"Page {page_num + 1} line {line_num}: Will initiate conversations in social "
+                                  f"situations with people you already know.")
+            y -= 15
+        pdf.showPage()
+    pdf.save()
+
+
+def two_pass_extraction(file_path, lines_to_remove_config, output_dir):
+    # The extraction loop as it was before pages were parsed once
+    base_name = os.path.splitext(os.path.basename(file_path))[0]
+    with open(file_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        num_pages = len(pdf_reader.pages)
+        with open(os.path.join(output_dir, f"{base_name}_raw.txt"), 'w', encoding='utf-8') as raw_file:
+            for page_num in range(num_pages):
+                raw_file.write(f"--- Page {page_num + 1} ---\n")
+                raw_file.write(pdf_reader.pages[page_num].extract_text() + '\n\n')
+        with open(os.path.join(output_dir, f"{base_name}_cleaned.txt"), 'w', encoding='utf-8') as cleaned_file:
+            for page_num in range(num_pages):
+                cleaned_file.write(f"--- Page {page_num + 1} ---\n")
+                config = lines_to_remove_config.get(page_num)
+                if config == "ALL":
+                    cleaned_file.write("\n")
+                elif isinstance(config, list):
+                    text = pdf_reader.pages[page_num].extract_text().split('\n')
+                    text = [line for i, line in enumerate(text) if i not in config]
+                    cleaned_file.write('\n'.join(text) + '\n\n')
+                else:
+                    cleaned_file.write(pdf_reader.pages[page_num].extract_text() + '\n\n')
+
+
+def best_of(repeat, func, *args, **kwargs):
+    timings = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        func(*args, **kwargs)
+        timings.append(time.perf_counter() - start_time)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf", nargs="?", help="PDF report to extract (defaults to a synthetic 17-page report)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = args.pdf
+        if pdf_path is None:
+            pdf_path = os.path.join(tmp_dir, "synthetic_report.pdf")
+            make_synthetic_report(pdf_path)
+
+        results = [
+            ("two-pass (previous)", best_of(args.repeat, two_pass_extraction, pdf_path, lines_to_remove, tmp_dir)),
+            ("single-pass", best_of(args.repeat, process_pdf_file, pdf_path, lines_to_remove, tmp_dir)),
+            ("single-pass, no raw", best_of(args.repeat, process_pdf_file, pdf_path, lines_to_remove, tmp_dir,
+                                            write_raw=False)),
+            (f"single-pass, {args.workers} workers", best_of(args.repeat, process_pdf_file, pdf_path,
+                                                             lines_to_remove, tmp_dir, workers=args.workers)),
+        ]
+
+    baseline = results[0][1]
+    for name, timing in results:
+        print(f"{name:<32} {timing * 1000:10.1f} ms  {baseline / timing:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
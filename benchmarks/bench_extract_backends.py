@@ -0,0 +1,52 @@
+"""
+Checks every installed PDF extraction backend for conformance with PyPDF2 and times the ones
+that pass, then names the fastest one to set as MBTI_EXTRACTION_BACKEND.
+
+A backend conforms when it splits every page into the same lines as PyPDF2, so the line
+indexes in lines_to_remove and fixed_text_data still point at the right lines. Run it on real
+client reports before switching: the synthetic ones only cover the simple layouts.
+
+Usage:
+    python benchmarks/bench_extract_backends.py [report.pdf ...] [--reports N] [--repeat N]
+
+Without PDF arguments N synthetic 17-page Step II reports are generated with reportlab.
+"""
+import os
+import sys
+import argparse
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from synthetic_reports import make_step2_reports
+from MBTIntelligence.extract_backends import BACKENDS, DEFAULT_BACKEND, select_backend
+from MBTIntelligence.consts import lines_to_remove
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="*", help="PDF reports to check and time (defaults to synthetic reports)")
+    parser.add_argument("--reports", type=int, default=5, help="Number of synthetic reports without PDF arguments")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_paths = args.pdfs or make_step2_reports(tmp_dir, args.reports)
+        selection = select_backend(pdf_paths, lines_to_remove, args.repeat)
+
+    results = selection['results']
+    baseline = results[DEFAULT_BACKEND]['seconds']
+    for name in BACKENDS:
+        result = results.get(name)
+        if result is None:
+            print(f"{name:<10} not installed ({BACKENDS[name].module})")
+        elif not result['conformant']:
+            print(f"{name:<10} not conformant: {len(result['problems'])} differences, first: {result['problems'][0]}")
+        else:
+            print(f"{name:<10} {result['seconds'] * 1000:10.1f} ms  {baseline / result['seconds']:5.2f}x")
+    print(f"Fastest conformant backend: {selection['backend']}")
+    if selection['backend'] != DEFAULT_BACKEND:
+        print(f"Set MBTI_EXTRACTION_BACKEND={selection['backend']} in .env to use it")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmarks generate_html_content against the previous regex and string concatenation version,
+and checks that both produce the same HTML.
+
+Usage:
+    python benchmarks/bench_html.py [--pages N] [--repeat N]
+
+The synthetic report repeats translated-style paragraphs with bold, underline and
+bold-underline markup on every page.
+"""
+import os
+import re
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from MBTIntelligence.mbti_to_pdf import generate_html_content, report_css, FOOTER_STATIC_TEXT
+from MBTIntelligence.consts import FIRST_PAGE_TITLE
+
+PARAGRAPH = ("__**מה מניע אותך?**__\n"
+             "**מוחצנות** מול מופנמות: אתה נוטה __ליזום שיחות__ במצבים חברתיים עם אנשים שאתה מכיר.\n"
+             "ציון: 3 - **בתוך הטווח** ולעתים __מחוץ לטווח__ המועדף.\n")
+
+
+def make_synthetic_pages(num_pages, paragraphs_per_page=12):
+    return [f"{page_num} ---\n" + PARAGRAPH * paragraphs_per_page for page_num in range(1, num_pages + 1)]
+
+
+def previous_apply_formatting(text):
+    text = re.sub(r'__\*\*(.*?)\*\*__', r'<b><u>\1</u></b>', text)
+    text = re.sub(r'\*\*(.*?)\*\*', r'<b>\1</b>', text)
+    text = re.sub(r'__(.*?)__', r'<u>\1</u>', text)
+    text = text.replace('\n', '<br>')
+    return text
+
+
+def previous_generate_html_content(header_image_url, pages, total_pages, footer_static_text, first_page_title):
+    # The HTML builder as it was before the templates and the split-based markup formatter,
+    # with the header already moved out of the pages so the output can be compared
+    html_head = f"""
+    <!DOCTYPE html>
+    <html lang="he" dir="rtl">
+    <head>
+        <meta charset="UTF-8">
+        <style>{report_css(footer_static_text)}</style>
+    </head>
+    <body>
+    """
+    html_head += f"""
+            <header><img src="{header_image_url}" alt="Header Image"></header>
+            """
+    html_body = ""
+    page_count = 1
+    for index, page in enumerate(pages):
+        page_content = re.sub(r'^\d+\s+---\s*', '', page).replace('\n', '<br>')
+        page_content = previous_apply_formatting(page_content)
+        if not page_content.strip():
+            continue
+        if index == 0:
+            html_body += f"""
+            <div class="page first-page">
+                <main>
+                    <div class="first-page-title">{first_page_title}</div><p>{page_content}</p>
+                </main>
+            </div>
+            """
+        else:
+            html_body += f"""
+            <div class="page page-{page_count}">
+                <main>
+                    <p>{page_content}</p>
+                </main>
+            </div>
+            """
+        page_count += 1
+    return html_head + html_body + "</body></html>"
+
+
+def best_of(repeat, func, *args):
+    timings = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start_time)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    pages = make_synthetic_pages(args.pages)
+    call_args = ("file:///logo.png", pages, len(pages), FOOTER_STATIC_TEXT, FIRST_PAGE_TITLE)
+    if previous_generate_html_content(*call_args) != generate_html_content(*call_args):
+        print("HTML output differs from the previous version")
+        return 1
+
+    results = [
+        ("regex passes (previous)", best_of(args.repeat, previous_generate_html_content, *call_args)),
+        ("templates + marker split", best_of(args.repeat, generate_html_content, *call_args)),
+    ]
+    baseline = results[0][1]
+    for name, timing in results:
+        print(f"{name:<32} {timing * 1000:10.1f} ms  {baseline / timing:5.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
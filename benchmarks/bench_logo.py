@@ -0,0 +1,74 @@
+"""
+Measures PDF render time and file size with the previous per-page full size logo and with
+the single header using the logo scaled to print resolution.
+
+Usage:
+    python benchmarks/bench_logo.py [--pages N] [--repeat N] [--logo PATH]
+
+Needs a working WeasyPrint installation (Pango).
+"""
+import os
+import re
+import sys
+import time
+import pathlib
+import argparse
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from MBTIntelligence.mbti_to_pdf import ReportRenderer, build_report_html
+from MBTIntelligence.assets import prepare_logo
+from MBTIntelligence.consts import FIRST_PAGE_TITLE
+
+DEFAULT_LOGO_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'media', 'full_logo.png'))
+PAGE_TEXT = "**כותרת**\n" + "אתה נוטה ליזום שיחות במצבים חברתיים עם אנשים שאתה כבר מכיר.\n" * 30
+HEADER_PATTERN = re.compile(r'\s*<header>.*?</header>\s*', re.DOTALL)
+
+
+def previous_layout_html(pages, logo_path):
+    # Every page div carrying its own fixed header with the full size logo, as before
+    html_content = build_report_html(pages, logo_path, FIRST_PAGE_TITLE, inline_css=False)
+    html_content = HEADER_PATTERN.sub('\n            ', html_content, count=1)
+    header = (f'<header><img src="{pathlib.Path(logo_path).absolute().as_uri()}" alt="Header Image"></header>'
+              f'\n                <main>')
+    return html_content.replace('<main>', header)
+
+
+def measure(renderer, html_content, output_pdf, repeat):
+    timings = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        renderer.render(html_content, output_pdf)
+        timings.append(time.perf_counter() - start_time)
+    return min(timings), os.path.getsize(output_pdf)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=17)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--logo", default=DEFAULT_LOGO_PATH)
+    args = parser.parse_args()
+
+    pages = [(page_num, PAGE_TEXT) for page_num in range(1, args.pages + 1)]
+    scaled_logo = prepare_logo(args.logo)
+    print(f"logo: {os.path.getsize(args.logo)} bytes -> {os.path.getsize(scaled_logo)} bytes ({scaled_logo})")
+
+    renderer = ReportRenderer()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output_pdf = os.path.join(tmp_dir, "report.pdf")
+        results = [
+            ("per-page full size logo", measure(renderer, previous_layout_html(pages, args.logo), output_pdf,
+                                                args.repeat)),
+            ("single header, scaled logo", measure(renderer, build_report_html(pages, args.logo, FIRST_PAGE_TITLE,
+                                                                               inline_css=False),
+                                                   output_pdf, args.repeat)),
+        ]
+
+    baseline = results[0][1][0]
+    for name, (timing, size) in results:
+        print(f"{name:<32} {timing * 1000:10.1f} ms  {baseline / timing:5.2f}x  {size / 1024:8.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Offline benchmark of the report pipeline stages on synthetic MBTI Step II reports.
+
+Every stage is timed on its own: process_pdf_file, translate_to_hebrew (with the stub
+translation backend, all reports concurrently), insert_fixed_text and generate_mbti_report.
+Results are printed and written as JSON, so runs on different commits can be compared.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--reports 1 10 100] [--latency S] [--tokens-per-second N]
+                                        [--output results.json] [--verbose]
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import contextlib
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from synthetic_reports import make_step2_reports
+
+STAGES = ["extract", "translate", "fixed_text", "render"]
+
+
+def summarize(durations, wall_time):
+    return {
+        'wall_s': wall_time,
+        'mean_s': statistics.mean(durations),
+        'p50_s': statistics.median(durations),
+        'max_s': max(durations),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_stages(pdf_paths, work_dir, logo_path):
+    # Imported here, after main() has selected the stub translation backend
+    from MBTIntelligence.extract_text import process_pdf_file
+    from MBTIntelligence.translation import translate_to_hebrew
+    from MBTIntelligence.fixed_text import insert_fixed_text
+    from MBTIntelligence.mbti_to_pdf import generate_mbti_report
+    from MBTIntelligence.report_document import ReportDocument
+    from MBTIntelligence.utils import get_all_info, get_formatted_type_qualities
+    from MBTIntelligence.consts import fixed_text_data, lines_to_remove, FIRST_PAGE_TITLE
+
+    durations = {stage: [] for stage in STAGES}
+    walls = {}
+
+    stage_start = time.perf_counter()
+    cleaned_paths = []
+    for pdf_path in pdf_paths:
+        start_time = time.perf_counter()
+        cleaned_paths.append(process_pdf_file(pdf_path, lines_to_remove, work_dir))
+        durations['extract'].append(time.perf_counter() - start_time)
+    walls['extract'] = time.perf_counter() - stage_start
+
+    async def translate(cleaned_path):
+        with open(cleaned_path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        start_time = time.perf_counter()
+        translated_text = await translate_to_hebrew(text, use_cache=False)
+        durations['translate'].append(time.perf_counter() - start_time)
+        return translated_text
+
+    async def translate_all():
+        return await asyncio.gather(*(translate(cleaned_path) for cleaned_path in cleaned_paths))
+
+    stage_start = time.perf_counter()
+    translated_texts = asyncio.run(translate_all())
+    walls['translate'] = time.perf_counter() - stage_start
+
+    stage_start = time.perf_counter()
+    fixed_documents = []
+    for pdf_path, translated_text in zip(pdf_paths, translated_texts):
+        start_time = time.perf_counter()
+        document = ReportDocument(translated_text)
+        mbti_info = get_all_info(document)
+        fixed_text_config = fixed_text_data(mbti_info, get_formatted_type_qualities(mbti_info['type']))
+        fixed_documents.append(ReportDocument(insert_fixed_text(document, None, fixed_text_config)))
+        durations['fixed_text'].append(time.perf_counter() - start_time)
+    walls['fixed_text'] = time.perf_counter() - stage_start
+
+    stage_start = time.perf_counter()
+    for pdf_path, fixed_document in zip(pdf_paths, fixed_documents):
+        output_pdf = os.path.join(work_dir, os.path.splitext(os.path.basename(pdf_path))[0] + "_report.pdf")
+        start_time = time.perf_counter()
+        generate_mbti_report(fixed_document, None, output_pdf, logo_path, FIRST_PAGE_TITLE, open_in_browser=False)
+        durations['render'].append(time.perf_counter() - start_time)
+    walls['render'] = time.perf_counter() - stage_start
+
+    return {stage: summarize(durations[stage], walls[stage]) for stage in STAGES}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--latency", type=float, default=0.5, help="Stub time to first token in seconds")
+    parser.add_argument("--tokens-per-second", type=float, default=2000.0, help="Stub generation speed")
+    parser.add_argument("--logo", default=os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'media',
+                                                                       'full_logo.png')))
+    parser.add_argument("--output", default=None, help="JSON results file")
+    parser.add_argument("--verbose", action="store_true", help="Show the output of the pipeline stages")
+    args = parser.parse_args()
+
+    os.environ['MBTI_TRANSLATION_BACKEND'] = 'stub'
+    os.environ['MBTI_STUB_LATENCY'] = str(args.latency)
+    os.environ['MBTI_STUB_TOKENS_PER_SECOND'] = str(args.tokens_per_second)
+    # The stub is not rate limited, so the scheduler budget should not be either
+    os.environ.setdefault('MBTI_OPENAI_RPM', '1000000')
+    os.environ.setdefault('MBTI_OPENAI_TPM', '1000000000')
+    # Keeps the stub translations out of the translation cache of real runs
+    cache_dir = tempfile.TemporaryDirectory()
+    os.environ['MBTI_TRANSLATION_CACHE_DIR'] = cache_dir.name
+
+    results = {
+        'commit': git_commit(),
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'stub': {'latency_s': args.latency, 'tokens_per_second': args.tokens_per_second},
+        'runs': []
+    }
+    for count in args.reports:
+        with tempfile.TemporaryDirectory() as work_dir:
+            pdf_paths = make_step2_reports(work_dir, count)
+            start_time = time.perf_counter()
+            with contextlib.ExitStack() as stack:
+                if not args.verbose:
+                    devnull = stack.enter_context(open(os.devnull, 'w'))
+                    stack.enter_context(contextlib.redirect_stdout(devnull))
+                stages = run_stages(pdf_paths, work_dir, args.logo)
+            total = time.perf_counter() - start_time
+        results['runs'].append({'reports': count, 'total_s': total, 'stages': stages})
+
+        print(f"{count} report(s): {total:.2f}s total")
+        for stage in STAGES:
+            timing = stages[stage]
+            print(f"  {stage:<12} wall {timing['wall_s'] * 1000:10.1f} ms   per report mean "
+                  f"{timing['mean_s'] * 1000:8.1f} ms  p50 {timing['p50_s'] * 1000:8.1f} ms  "
+                  f"max {timing['max_s'] * 1000:8.1f} ms")
+    cache_dir.cleanup()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Synthetic MBTI Step II shaped PDF reports for the offline benchmarks.
+
+The reports have the 17 pages, line counts and fields (name, date, type, facet scores)
+that lines_to_remove and the info lookups expect, filled with generated text.
+"""
+import os
+import random
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+MBTI_TYPES = ["ISTJ", "ISFJ", "INFJ", "INTJ", "ISTP", "ISFP", "INFP", "INTP",
+              "ESTP", "ESFP", "ENFP", "ENTP", "ESTJ", "ESFJ", "ENFJ", "ENTJ"]
+FACETS = ["Initiating", "Expressive", "Gregarious", "Active", "Enthusiastic", "Concrete", "Realistic",
+          "Practical", "Experiential", "Traditional", "Logical", "Reasonable", "Questioning", "Critical",
+          "Tough", "Systematic", "Planful", "Early Starting", "Scheduled", "Methodical"]
+WORDS = ("you tend to prefer people situations work decisions information energy others feel comfortable "
+         "when making plans about details future possibilities logical outcomes harmony values structure "
+         "flexible schedule organize focus attention conversation ideas experience practical").split()
+PAGE_LINES = 45
+
+
+def sentence(rng):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 14))).capitalize() + "."
+
+
+def report_lines(page_num, name, mbti_type, rng):
+    if page_num == 0:
+        header = ["MBTI Step II", "Interpretive Report", "Myers-Briggs Type Indicator", "Developed by",
+                  "Naomi L. Quenk", "Jean M. Kummerow", "Report prepared for", "The Myers-Briggs Company"]
+        return header + [name, f"April {rng.randint(1, 28)}, 2024", f"Your reported type: {mbti_type}"] + \
+            [sentence(rng) for _ in range(PAGE_LINES - len(header) - 3)]
+    lines = [f"{name} - {mbti_type}", "MBTI Step II Interpretive Report", f"Page {page_num + 1}"]
+    if page_num == 2:
+        # The first line of the type summary kept by lines_to_remove
+        lines.append(f"Your reported type: {mbti_type}")
+    for line_num in range(len(lines), PAGE_LINES):
+        if line_num % 9 == 0:
+            facet = rng.choice(FACETS)
+            lines.append(f"{facet} {rng.randint(0, 5)} - out-of-preference score on {facet.lower()}")
+        else:
+            lines.append(sentence(rng))
+    return lines
+
+
+def make_step2_report(path, name="Dana Levi", mbti_type="ESTJ", num_pages=17, seed=0):
+    rng = random.Random(seed)
+    pdf = canvas.Canvas(path, pagesize=A4)
+    for page_num in range(num_pages):
+        y = 810
+        for line in report_lines(page_num, name, mbti_type, rng):
+            pdf.drawString(36, y, line)
+            y -= 17
+        pdf.showPage()
+    pdf.save()
+
+
+def make_step2_reports(directory, count, num_pages=17):
+    """Writes count distinct reports to directory and returns their paths."""
+    paths = []
+    for index in range(count):
+        path = os.path.join(directory, f"synthetic_report_{index:03d}.pdf")
+        make_step2_report(path, name=f"Person {index:03d}", mbti_type=MBTI_TYPES[index % len(MBTI_TYPES)],
+                          num_pages=num_pages, seed=index)
+        paths.append(path)
+    return paths
@@ -1,19 +1,25 @@
 # __init__.py
 from .extract_text import process_pdf_file
 from .utils import get_all_info, extract_mbti_qualities_scores
-from .fixed_text import insert_fixed_text
+from .fixed_text import insert_fixed_text, splice_fixed_text
 from .main import MBTIProcessorGUI
-from .translation import translate_to_hebrew
+from .translation import translate_to_hebrew, stream_translate_to_hebrew
 from .mbti_to_pdf import generate_mbti_report
+from .report_document import ReportDocument
+from .pipeline import run_pipeline
 
 __all__ = [
     'process_pdf_file',
     'get_all_info',
     'extract_mbti_qualities_scores',
     'insert_fixed_text',
+    'splice_fixed_text',
     'MBTIProcessorGUI',
     'translate_to_hebrew',
-    'generate_mbti_report'
+    'stream_translate_to_hebrew',
+    'generate_mbti_report',
+    'ReportDocument',
+    'run_pipeline'
 ]
 
 __version__ = '0.3.0alpha'
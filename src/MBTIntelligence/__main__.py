@@ -0,0 +1,31 @@
+import sys
+import argparse
+
+from . import batch, service
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="MBTIntelligence", description="MBTI report processor")
+    subparsers = parser.add_subparsers(dest="command")
+
+    batch_parser = subparsers.add_parser("batch", help="Process a directory of MBTI PDF reports without the GUI")
+    batch.add_arguments(batch_parser)
+    batch_parser.set_defaults(func=batch.run)
+
+    serve_parser = subparsers.add_parser("serve", help="Run the local HTTP report service")
+    service.add_arguments(serve_parser)
+    serve_parser.set_defaults(func=service.run)
+
+    args = parser.parse_args(argv)
+    if args.command is None:
+        import tkinter as tk
+        from .main import MBTIProcessorGUI
+        root = tk.Tk()
+        MBTIProcessorGUI(root)
+        root.mainloop()
+        return 0
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
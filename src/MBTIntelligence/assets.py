@@ -0,0 +1,127 @@
+import os
+import hashlib
+import threading
+from typing import Dict, Iterable, Tuple
+
+from PIL import Image
+from fontTools import subset
+from fontTools.ttLib import TTFont
+from fontTools.varLib import instancer
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_ASSET_CACHE_DIR = os.path.join(ROOT_DIR, "cache", "assets")
+
+# The logo is shown at this height in the report header (see 'header img' in REPORT_CSS)
+LOGO_HEIGHT_PX = 70
+PRINT_DPI = 300
+CSS_PX_PER_INCH = 96
+
+DEFAULT_FONT_PATH = os.path.join(ROOT_DIR, "media", "fonts", "FrankRuhlLibre-VariableFont_wght.ttf")
+REPORT_FONT_FAMILY = "Frank Ruhl Libre"
+# Regular text and <b>; the variable font is cut into one static instance per weight
+REPORT_FONT_WEIGHTS = (400, 700)
+# Basic Latin and Latin-1, Hebrew, general punctuation, currency signs and Hebrew presentation forms
+FONT_SUBSET_UNICODES = "U+0020-00FF,U+0590-05FF,U+2000-206F,U+20A0-20CF,U+FB1D-FB4F"
+
+_prepared: Dict[Tuple, object] = {}
+_lock = threading.Lock()
+
+
+def file_sha256(path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def print_pixels(css_px: float, dpi: int = PRINT_DPI) -> int:
+    return round(css_px * dpi / CSS_PX_PER_INCH)
+
+
+def prepare_logo(logo_path: str, height_px: int = LOGO_HEIGHT_PX, dpi: int = PRINT_DPI,
+                 cache_dir: str = DEFAULT_ASSET_CACHE_DIR) -> str:
+    """
+    Returns a copy of the logo downscaled to what height_px CSS pixels need at the given
+    print resolution. Scaled copies are cached on disk by the hash of the source image, so
+    a changed logo is picked up and an unchanged one is only scaled once.
+
+    Args:
+        logo_path: The source image
+        height_px: Displayed height in CSS pixels
+        dpi: Print resolution the copy has to support
+
+    Returns:
+        The path of the scaled copy, or logo_path itself if it is already small enough.
+    """
+    stat = os.stat(logo_path)
+    memo_key = (os.path.abspath(logo_path), stat.st_mtime_ns, stat.st_size, height_px, dpi)
+    with _lock:
+        if memo_key in _prepared:
+            return _prepared[memo_key]
+
+    target_height = print_pixels(height_px, dpi)
+    asset_path = os.path.join(cache_dir, f"{file_sha256(logo_path)}-{target_height}.png")
+    if not os.path.exists(asset_path):
+        with Image.open(logo_path) as logo_img:
+            if logo_img.height <= target_height:
+                asset_path = logo_path
+            else:
+                target_width = max(1, round(logo_img.width * target_height / logo_img.height))
+                scaled_img = logo_img.resize((target_width, target_height), Image.LANCZOS)
+                os.makedirs(cache_dir, exist_ok=True)
+                tmp_path = f"{asset_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                scaled_img.save(tmp_path, format="PNG", optimize=True)
+                os.replace(tmp_path, asset_path)
+
+    with _lock:
+        _prepared[memo_key] = asset_path
+    return asset_path
+
+
+def _instance_font(font_path: str, weight: int, output_path: str) -> None:
+    font = TTFont(font_path)
+    if 'fvar' in font:
+        font = instancer.instantiateVariableFont(font, {'wght': weight})
+    options = subset.Options()
+    # Keep every OpenType feature, Hebrew needs its mark positioning
+    options.layout_features = ['*']
+    options.name_IDs = ['*']
+    options.notdef_outline = True
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=subset.parse_unicodes(FONT_SUBSET_UNICODES))
+    subsetter.subset(font)
+    tmp_path = f"{output_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    font.save(tmp_path)
+    os.replace(tmp_path, output_path)
+
+
+def prepare_report_fonts(font_path: str = DEFAULT_FONT_PATH, weights: Iterable[int] = REPORT_FONT_WEIGHTS,
+                         cache_dir: str = DEFAULT_ASSET_CACHE_DIR) -> Dict[int, str]:
+    """
+    Cuts the bundled variable font into static instances for the given weights, subset to
+    the Latin and Hebrew ranges in FONT_SUBSET_UNICODES. Like the logo, the instances are
+    cached on disk by the hash of the source font.
+
+    Returns:
+        A dictionary mapping each weight to the path of its font file.
+    """
+    weights = tuple(weights)
+    stat = os.stat(font_path)
+    memo_key = (os.path.abspath(font_path), stat.st_mtime_ns, stat.st_size, weights, FONT_SUBSET_UNICODES)
+    with _lock:
+        if memo_key in _prepared:
+            return _prepared[memo_key]
+
+    source_hash = file_sha256(font_path)
+    subset_hash = hashlib.sha256(FONT_SUBSET_UNICODES.encode('ascii')).hexdigest()[:8]
+    font_paths = {}
+    for weight in weights:
+        font_paths[weight] = os.path.join(cache_dir, f"{source_hash}-{weight}-{subset_hash}.ttf")
+        if not os.path.exists(font_paths[weight]):
+            os.makedirs(cache_dir, exist_ok=True)
+            _instance_font(font_path, weight, font_paths[weight])
+
+    with _lock:
+        _prepared[memo_key] = font_paths
+    return font_paths
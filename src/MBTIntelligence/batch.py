@@ -0,0 +1,143 @@
+import os
+import glob
+import time
+import asyncio
+import argparse
+from concurrent.futures import Executor
+from typing import Dict, Iterable, List, Optional
+
+from .pipeline import run_pipeline, translation_memory, DEFAULT_OUTPUT_DIR, DEFAULT_LOGO_PATH
+from .translation import scheduler
+from .mbti_to_pdf import create_render_pool
+from .checkpoints import STAGES
+
+
+async def process_file(pdf_path: str, output_dir: str, logo_path: str, pool: Executor,
+                       translation_slots: asyncio.Semaphore, by_page: bool = False,
+                       use_cache: bool = True, max_output_tokens: Optional[int] = None,
+                       keep_intermediates: bool = False, use_checkpoints: bool = True,
+                       force_stages: Iterable[str] = (), mask_translation: bool = True,
+                       use_memory: bool = True) -> Dict[str, object]:
+    start_time = time.perf_counter()
+    result = {'file': pdf_path, 'status': 'success', 'output': None, 'error': None}
+    try:
+        # Extraction and rendering run in the worker processes, translation on the shared event loop
+        result['output'] = await run_pipeline(pdf_path, output_dir, logo_path, keep_intermediates=keep_intermediates,
+                                              streaming=False, use_cache=use_cache, by_page=by_page,
+                                              max_output_tokens=max_output_tokens, executor=pool,
+                                              translation_slots=translation_slots, use_checkpoints=use_checkpoints,
+                                              force_stages=force_stages, mask_translation=mask_translation,
+                                              use_memory=use_memory)
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = str(e)
+    result['elapsed'] = time.perf_counter() - start_time
+    return result
+
+
+async def process_batch(input_dir: str, output_dir: Optional[str] = None, workers: Optional[int] = None,
+                        max_translations: int = 8, logo_path: str = DEFAULT_LOGO_PATH,
+                        by_page: bool = False, use_cache: bool = True,
+                        max_output_tokens: Optional[int] = None,
+                        keep_intermediates: bool = False, use_checkpoints: bool = True,
+                        force_stages: Iterable[str] = (), mask_translation: bool = True,
+                        use_memory: bool = True) -> List[Dict[str, object]]:
+    """
+    Processes every PDF in input_dir. Extraction and rendering run on a pool of worker
+    processes, translations run concurrently on the current event loop.
+
+    Args:
+        input_dir: Directory containing the MBTI Step II PDF reports
+        output_dir: Directory for the generated files (defaults to the package output folder)
+        workers: Number of worker processes (defaults to the number of CPUs)
+        max_translations: Maximum number of reports being translated at once
+        logo_path: Logo used in the generated report header
+        by_page: Translate every report page by page (see translate_to_hebrew)
+        use_cache: Reuse cached translations for text that was already translated
+        max_output_tokens: Pack pages into requests of at most this many estimated output tokens
+        keep_intermediates: Also write the intermediate text and HTML files of every report
+        use_checkpoints: Skip the stages already completed for a report in an earlier run
+        force_stages: Stages to rerun for every report even if they have a checkpoint
+        mask_translation: Only send the lines that need translating (see TranslationMask)
+        use_memory: Reuse the translations of lines seen in earlier reports (see TranslationMemory)
+
+    Returns:
+        A list with one result dictionary per input file, in file name order.
+    """
+    output_dir = output_dir or DEFAULT_OUTPUT_DIR
+    os.makedirs(output_dir, exist_ok=True)
+    if not os.path.exists(logo_path):
+        raise FileNotFoundError(f"Logo file not found at {logo_path}")
+
+    pdf_files = sorted(glob.glob(os.path.join(input_dir, "*.pdf")))
+    translation_slots = asyncio.Semaphore(max_translations)
+    # Long-lived workers, each keeping its renderer (stylesheet, fonts, images) for all the reports it renders
+    with create_render_pool(workers) as pool:
+        return await asyncio.gather(
+            *(process_file(pdf_path, output_dir, logo_path, pool, translation_slots, by_page, use_cache,
+                           max_output_tokens, keep_intermediates, use_checkpoints, force_stages,
+                           mask_translation, use_memory)
+              for pdf_path in pdf_files)
+        )
+
+
+def print_summary(results: List[Dict[str, object]], wall_time: float) -> None:
+    for result in results:
+        name = os.path.basename(result['file'])
+        if result['status'] == 'success':
+            print(f"[SUCCESS] {name} ({result['elapsed']:.1f}s): {result['output']}")
+        else:
+            print(f"[FAILED] {name} ({result['elapsed']:.1f}s): {result['error']}")
+    succeeded = sum(1 for result in results if result['status'] == 'success')
+    print(f"Processed {len(results)} files: {succeeded} succeeded, {len(results) - succeeded} failed.")
+    print(f"Total wall time: {wall_time:.1f}s")
+    stats = scheduler.stats()
+    print(f"OpenAI requests: {stats['requests']} ({stats['retries']} retries, {stats['rate_limited']} rate limited), "
+          f"mean queue wait {stats['mean_wait']:.2f}s, max {stats['max_wait']:.2f}s")
+    memory_stats = translation_memory.stats()
+    looked_up = memory_stats['hits'] + memory_stats['misses']
+    if looked_up:
+        print(f"Translation memory: {memory_stats['hits']} of {looked_up} lines reused "
+              f"({memory_stats['hits'] / looked_up:.0%}), {memory_stats['added']} added, "
+              f"{memory_stats['segments']} stored")
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("input_dir", help="Directory containing MBTI PDF reports")
+    parser.add_argument("-o", "--output-dir", default=None, help="Directory for generated reports")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="Number of worker processes for extraction and rendering")
+    parser.add_argument("-t", "--max-translations", type=int, default=8,
+                        help="Maximum number of reports being translated at once")
+    parser.add_argument("--by-page", action="store_true",
+                        help="Translate each page in its own concurrent request")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Ignore cached translations and request new ones")
+    parser.add_argument("--max-output-tokens", type=int, default=None,
+                        help="Pack consecutive pages into requests that fit this output token budget")
+    parser.add_argument("--keep-intermediates", action="store_true",
+                        help="Also write the _cleaned, _hebrew, _fixed and _report.html files for debugging")
+    parser.add_argument("--no-checkpoints", action="store_true",
+                        help="Run every stage from scratch and do not store stage checkpoints")
+    parser.add_argument("--force-stage", action="append", choices=STAGES, default=[],
+                        help="Rerun this stage even if it has a checkpoint (can be repeated)")
+    parser.add_argument("--no-translation-mask", action="store_true",
+                        help="Send every line for translation, including the ones that can skip it")
+    parser.add_argument("--no-translation-memory", action="store_true",
+                        help="Do not reuse or store line translations in the translation memory")
+
+
+def run(args: argparse.Namespace) -> int:
+    if not os.path.isdir(args.input_dir):
+        print(f"Error: {args.input_dir} is not a directory.")
+        return 2
+    start_time = time.perf_counter()
+    results = asyncio.run(process_batch(args.input_dir, args.output_dir, args.workers, args.max_translations,
+                                        by_page=args.by_page, use_cache=not args.no_cache,
+                                        max_output_tokens=args.max_output_tokens,
+                                        keep_intermediates=args.keep_intermediates,
+                                        use_checkpoints=not args.no_checkpoints, force_stages=args.force_stage,
+                                        mask_translation=not args.no_translation_mask,
+                                        use_memory=not args.no_translation_memory))
+    print_summary(results, time.perf_counter() - start_time)
+    return 0 if all(result['status'] == 'success' for result in results) else 1
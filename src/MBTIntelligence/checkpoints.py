@@ -0,0 +1,170 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from .utils import Page, join_pages
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_CHECKPOINT_DIR = os.path.join(ROOT_DIR, "cache", "checkpoints")
+DEFAULT_CHECKPOINT_MAX_BYTES = 1024 * 1024 * 1024
+# Eviction frees space down to this share of max_bytes, so the scan of the whole store it
+# needs runs once every many saves instead of on every save once the store is full
+EVICTION_LOW_WATER = 0.9
+
+# Pipeline stages in order; the output of each one is the input of the next
+STAGES = ('extract', 'translate', 'fixed_text', 'render')
+# Bump when the format of the stored checkpoints changes
+CHECKPOINT_VERSION = 1
+
+
+def text_sha256(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def pages_sha256(pages: Iterable[Page]) -> str:
+    return text_sha256(join_pages(pages))
+
+
+class CheckpointStore:
+    """
+    On-disk outputs of the pipeline stages, so that a rerun can resume at the first stage
+    without a valid checkpoint instead of starting over.
+
+    A stage's key is the hash of its input and of the configuration that affects its output.
+    Extraction's input is the source PDF; every later stage's input is the output of the stage
+    before it, so a stage that is rerun with a different result invalidates the stages after
+    it and nothing else.
+
+    Like the translation cache, loading a checkpoint refreshes its modification time, and the
+    least recently used checkpoints are removed once the total size goes over max_bytes.
+    The methods do blocking file I/O, so async callers run them in a thread.
+    """
+
+    def __init__(self, checkpoint_dir: str = DEFAULT_CHECKPOINT_DIR, max_bytes: int = DEFAULT_CHECKPOINT_MAX_BYTES):
+        self.checkpoint_dir = checkpoint_dir
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._size = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(stage: str, input_hash: str, config: Dict[str, object]) -> str:
+        payload = json.dumps({
+            'stage': stage,
+            'input': input_hash,
+            'config': config,
+            'version': CHECKPOINT_VERSION
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, stage: str, key: str, extension: str) -> str:
+        return os.path.join(self.checkpoint_dir, stage, key[:2], key + extension)
+
+    def _replace(self, tmp_path: str, path: str) -> None:
+        with self._lock:
+            # An overwritten checkpoint only adds the difference to the total
+            try:
+                replaced_size = os.path.getsize(path)
+            except FileNotFoundError:
+                replaced_size = 0
+            os.replace(tmp_path, path)
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += os.path.getsize(path) - replaced_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _write_atomic(self, path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        self._replace(tmp_path, path)
+
+    def load_pages(self, stage: str, key: str) -> Optional[List[Page]]:
+        """Returns the pages stored for the stage, or None if there is no valid checkpoint."""
+        path = self._entry_path(stage, key, ".json")
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            if entry['key'] != key:
+                raise ValueError("checkpoint key mismatch")
+            os.utime(path)
+            return [Page(int(number), text) for number, text in entry['pages']]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            # A truncated or foreign file is treated as missing and overwritten by the rerun
+            logging.warning(f"[WARNING] Ignoring invalid {stage} checkpoint {path}: {e}")
+            return None
+
+    def save_pages(self, stage: str, key: str, pages: Iterable[Page]) -> None:
+        entry = {'stage': stage, 'key': key, 'pages': [[page.number, page.text] for page in pages]}
+        self._write_atomic(self._entry_path(stage, key, ".json"),
+                           json.dumps(entry, ensure_ascii=False).encode('utf-8'))
+
+    def load_file(self, stage: str, key: str, output_path: str) -> bool:
+        """Copies the file stored for the stage to output_path; False if there is no valid checkpoint."""
+        path = self._entry_path(stage, key, ".pdf")
+        try:
+            with open(path, 'rb') as f:
+                if f.read(4) != b'%PDF':
+                    logging.warning(f"[WARNING] Ignoring invalid {stage} checkpoint {path}")
+                    return False
+        except FileNotFoundError:
+            return False
+        shutil.copyfile(path, output_path)
+        os.utime(path)
+        return True
+
+    def save_file(self, stage: str, key: str, source_path: str) -> None:
+        path = self._entry_path(stage, key, ".pdf")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.copyfile(source_path, tmp_path)
+        self._replace(tmp_path, path)
+
+    def _entries(self):
+        entries = []
+        for stage in STAGES:
+            stage_dir = os.path.join(self.checkpoint_dir, stage)
+            if not os.path.isdir(stage_dir):
+                continue
+            for shard in os.scandir(stage_dir):
+                if not shard.is_dir():
+                    continue
+                for entry in os.scandir(shard.path):
+                    if entry.name.endswith((".json", ".pdf")):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self) -> None:
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * EVICTION_LOW_WATER
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.evictions += 1
+        self._size = total
+
+    def clear(self, stage: Optional[str] = None) -> None:
+        """Removes the checkpoints of one stage, or of every stage."""
+        with self._lock:
+            for name in ([stage] if stage else STAGES):
+                shutil.rmtree(os.path.join(self.checkpoint_dir, name), ignore_errors=True)
+            self._size = None
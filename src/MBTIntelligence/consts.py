@@ -224,3 +224,12 @@ lines_to_remove = {
          29, 30, 31, 32, 33, 34, 35, 36, 37, 38, 39, 46, 47, 48, 49, 50, 51, 52, 53, 54, 55, 56, 57, 58, 59,
          60, 61, 62, 63, 64, 65, 66]
 }
+
+# Lines that are not sent for translation and stay as extracted, in the lines_to_remove format but
+# numbered like fixed_text_data: by the "--- Page N ---" page number, counting lines from 1 after the
+# delimiter. Lines removed by "DELETE" in fixed_text_data and lines without words (scores, dates in
+# digits, type codes) are skipped automatically; list here the lines of real reports that the fixed
+# text makes redundant or that must stay in English.
+lines_to_keep_untranslated = {}
+
+FIRST_PAGE_TITLE = "דו&quot;ח בתרגום לעברית עבור: "
@@ -0,0 +1,221 @@
+import os
+import re
+import abc
+import mmap
+import time
+import importlib
+import contextlib
+from typing import Dict, Iterator, List, Optional, Sequence, Union
+
+DEFAULT_BACKEND = "pypdf2"
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+@contextlib.contextmanager
+def open_mapped(file_path: str) -> Iterator[Union[mmap.mmap, bytes]]:
+    """
+    Maps a file read-only into memory, so readers seek and read it without a system call per
+    read and without buffering copies of it. Empty files, which cannot be mapped, read as b''.
+    """
+    with open(file_path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            yield b''
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield data
+
+
+class ExtractionBackend(abc.ABC):
+    """
+    A PDF text extraction library. Backends have to split pages into the same lines as PyPDF2,
+    since consts.lines_to_remove and fixed_text_data refer to lines by index; check_conformance
+    verifies that on real reports before a backend is used.
+
+    Subclasses only import their library when they are used, so every backend but the default
+    one is optional.
+    """
+
+    name = None
+    module = None
+
+    @classmethod
+    def available(cls) -> bool:
+        try:
+            importlib.import_module(cls.module)
+        except ImportError:
+            return False
+        return True
+
+    @abc.abstractmethod
+    def page_count(self, file_path: str) -> int:
+        pass
+
+    @abc.abstractmethod
+    def extract_pages(self, file_path: str, page_numbers: Sequence[int]) -> List[str]:
+        """The text of the given zero-based pages, opening the document once."""
+
+
+class PyPDF2Backend(ExtractionBackend):
+    name = "pypdf2"
+    module = "PyPDF2"
+
+    def page_count(self, file_path: str) -> int:
+        import PyPDF2
+        with open_mapped(file_path) as data:
+            return len(PyPDF2.PdfReader(data).pages)
+
+    def extract_pages(self, file_path: str, page_numbers: Sequence[int]) -> List[str]:
+        import PyPDF2
+        with open_mapped(file_path) as data:
+            pdf_reader = PyPDF2.PdfReader(data)
+            return [pdf_reader.pages[page_num].extract_text() for page_num in page_numbers]
+
+
+class PypdfBackend(ExtractionBackend):
+    """pypdf, the maintained successor of PyPDF2, with the same API and a faster content stream parser."""
+
+    name = "pypdf"
+    module = "pypdf"
+
+    def page_count(self, file_path: str) -> int:
+        import pypdf
+        with open_mapped(file_path) as data:
+            return len(pypdf.PdfReader(data).pages)
+
+    def extract_pages(self, file_path: str, page_numbers: Sequence[int]) -> List[str]:
+        import pypdf
+        with open_mapped(file_path) as data:
+            pdf_reader = pypdf.PdfReader(data)
+            return [pdf_reader.pages[page_num].extract_text() for page_num in page_numbers]
+
+
+class PyMuPDFBackend(ExtractionBackend):
+    name = "pymupdf"
+    module = "pymupdf"
+
+    def page_count(self, file_path: str) -> int:
+        import pymupdf
+        with pymupdf.open(file_path) as document:
+            return document.page_count
+
+    def extract_pages(self, file_path: str, page_numbers: Sequence[int]) -> List[str]:
+        import pymupdf
+        with pymupdf.open(file_path) as document:
+            # PyPDF2 does not clip text that runs past the page edge
+            return [document[page_num].get_text("text", clip=pymupdf.INFINITE_RECT()) for page_num in page_numbers]
+
+
+class PdfiumBackend(ExtractionBackend):
+    name = "pdfium"
+    module = "pypdfium2"
+
+    def page_count(self, file_path: str) -> int:
+        import pypdfium2
+        document = pypdfium2.PdfDocument(file_path)
+        try:
+            return len(document)
+        finally:
+            document.close()
+
+    def extract_pages(self, file_path: str, page_numbers: Sequence[int]) -> List[str]:
+        import pypdfium2
+        document = pypdfium2.PdfDocument(file_path)
+        try:
+            texts = []
+            for page_num in page_numbers:
+                text = document[page_num].get_textpage().get_text_range()
+                texts.append(text.replace('\r\n', '\n').replace('\r', '\n'))
+            return texts
+        finally:
+            document.close()
+
+
+BACKENDS = {backend.name: backend for backend in (PyPDF2Backend, PypdfBackend, PyMuPDFBackend, PdfiumBackend)}
+
+
+def available_backends() -> List[str]:
+    return [name for name, backend in BACKENDS.items() if backend.available()]
+
+
+def get_backend(name: Optional[str] = None) -> ExtractionBackend:
+    """Returns the backend called name, defaulting to MBTI_EXTRACTION_BACKEND and then PyPDF2."""
+    name = (name or os.getenv('MBTI_EXTRACTION_BACKEND') or DEFAULT_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown extraction backend {name!r}, expected one of {', '.join(BACKENDS)}")
+    if not BACKENDS[name].available():
+        raise ImportError(f"The {name} extraction backend needs the {BACKENDS[name].module} package")
+    return BACKENDS[name]()
+
+
+def _normalize_line(line: str) -> str:
+    return WHITESPACE_PATTERN.sub(' ', line).strip()
+
+
+def check_conformance(backend: Union[str, ExtractionBackend], file_path: str,
+                      lines_to_remove_config: Dict[int, Union[str, List[int]]],
+                      reference: Union[str, ExtractionBackend] = DEFAULT_BACKEND) -> List[str]:
+    """
+    Compares the line splits of a backend with the reference backend on one PDF. A page conforms
+    when it has the same number of lines with the same text, ignoring spacing, so the line indexes
+    in the config remove the same lines. Trailing empty lines are ignored, since the cleaned pages
+    are stripped of them anyway. Pages the config drops entirely are not compared.
+
+    Returns:
+        A description of every difference found; an empty list means the backend conforms.
+    """
+    backend = get_backend(backend) if isinstance(backend, str) else backend
+    reference = get_backend(reference) if isinstance(reference, str) else reference
+    num_pages = reference.page_count(file_path)
+    if backend.page_count(file_path) != num_pages:
+        return [f"{backend.name} reads {backend.page_count(file_path)} pages, {reference.name} reads {num_pages}"]
+
+    page_numbers = [page_num for page_num in range(num_pages) if lines_to_remove_config.get(page_num) != "ALL"]
+    problems = []
+    for page_num, expected, actual in zip(page_numbers, reference.extract_pages(file_path, page_numbers),
+                                          backend.extract_pages(file_path, page_numbers)):
+        expected_lines = expected.rstrip('\n').split('\n')
+        actual_lines = actual.rstrip('\n').split('\n')
+        if len(expected_lines) != len(actual_lines):
+            problems.append(f"page {page_num + 1}: {len(actual_lines)} lines, expected {len(expected_lines)}")
+            continue
+        for line_num, (expected_line, actual_line) in enumerate(zip(expected_lines, actual_lines)):
+            if _normalize_line(expected_line) != _normalize_line(actual_line):
+                problems.append(f"page {page_num + 1} line {line_num}: {actual_line!r}, expected {expected_line!r}")
+                break
+    return problems
+
+
+def time_backend(backend: Union[str, ExtractionBackend], file_paths: Sequence[str], repeat: int = 3) -> float:
+    """Best of repeat wall times for extracting every page of every file, in seconds."""
+    backend = get_backend(backend) if isinstance(backend, str) else backend
+    timings = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        for file_path in file_paths:
+            backend.extract_pages(file_path, range(backend.page_count(file_path)))
+        timings.append(time.perf_counter() - start_time)
+    return min(timings)
+
+
+def select_backend(file_paths: Sequence[str], lines_to_remove_config: Dict[int, Union[str, List[int]]],
+                   repeat: int = 3) -> Dict[str, object]:
+    """
+    Checks every installed backend for conformance on the given reports and times the ones that
+    pass. The default backend is the reference, so it is always conformant.
+
+    Returns:
+        {'backend': name of the fastest conformant backend,
+         'results': {name: {'conformant': bool, 'problems': [...], 'seconds': float or None}}}
+    """
+    results = {}
+    for name in available_backends():
+        problems = []
+        for file_path in file_paths:
+            problems.extend(f"{os.path.basename(file_path)} {problem}"
+                            for problem in check_conformance(name, file_path, lines_to_remove_config))
+        conformant = not problems
+        results[name] = {'conformant': conformant, 'problems': problems,
+                         'seconds': time_backend(name, file_paths, repeat) if conformant else None}
+    fastest = min((name for name, result in results.items() if result['conformant']),
+                  key=lambda name: results[name]['seconds'])
+    return {'backend': fastest, 'results': results}
@@ -1,95 +1,158 @@
-import PyPDF2
 import os
 import glob
 from dotenv import load_dotenv
 import time
 import re
-from typing import Dict, Union, List
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Union, List, Optional
 
+try:
+    from .utils import Page
+    from .extract_backends import get_backend
+except ImportError:
+    from utils import Page
+    from extract_backends import get_backend
 
-def extract_text_from_pdf(pdf_path, lines_to_remove_by_page):
+
+def extract_text_from_pdf(pdf_path, lines_to_remove_by_page, backend=None):
     extracted_text = ""
     try:
-        with open(pdf_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            num_pages = len(pdf_reader.pages)
-            print(f"PDF has {num_pages} pages.")
-
-            for page_num in range(num_pages):
-                page = pdf_reader.pages[page_num]
-                page_text = page.extract_text()
+        extraction_backend = get_backend(backend)
+        num_pages = extraction_backend.page_count(pdf_path)
+        print(f"PDF has {num_pages} pages.")
+        page_texts = extraction_backend.extract_pages(pdf_path, range(num_pages))
+        for page_num in range(num_pages):
+            page_text = page_texts[page_num]
+
+            # Split the text into lines
+            lines = page_text.split('\n')
+
+            # Process page text based on lines_to_remove_by_page
+            if lines_to_remove_by_page and page_num in lines_to_remove_by_page:
+                if lines_to_remove_by_page[page_num] == "ALL":
+                    lines = []
+                    print(f"Skipped all content from page {page_num + 1}.")
+                else:
+                    remove_items = lines_to_remove_by_page[page_num]
+                    if all(isinstance(item, int) for item in remove_items):
+                        lines = [line for i, line in enumerate(lines) if i not in remove_items]
+                    else:
+                        lines = [line for line in lines if not any(item in line for item in remove_items)]
 
-                # Split the text into lines
-                lines = page_text.split('\n')
+            # Join the processed lines
+            processed_page_text = '\n'.join(lines)
+            print(f"Processed page number {page_num+1} {processed_page_text}:")
+            # Add page delimiter
+            extracted_text += f"\n--- Page {page_num + 1} ---\n\n"
+            extracted_text += processed_page_text + "\n"
 
-                # Process page text based on lines_to_remove_by_page
-                if lines_to_remove_by_page and page_num in lines_to_remove_by_page:
-                    if lines_to_remove_by_page[page_num] == "ALL":
-                        lines = []
-                        print(f"Skipped all content from page {page_num + 1}.")
-                    else:
-                        remove_items = lines_to_remove_by_page[page_num]
-                        if all(isinstance(item, int) for item in remove_items):
-                            lines = [line for i, line in enumerate(lines) if i not in remove_items]
-                        else:
-                            lines = [line for line in lines if not any(item in line for item in remove_items)]
-
-                # Join the processed lines
-                processed_page_text = '\n'.join(lines)
-                print(f"Processed page number {page_num+1} {processed_page_text}:")
-                # Add page delimiter
-                extracted_text += f"\n--- Page {page_num + 1} ---\n\n"
-                extracted_text += processed_page_text + "\n"
-
-            print("Text extraction completed successfully.")
+        print("Text extraction completed successfully.")
     except Exception as e:
         print(f"An error occurred: {e}")
 
     return extracted_text
 
 
-def process_pdf_file(file_path: str, lines_to_remove_config: Dict[int, Union[str, List[int]]]) -> str:
+def _extract_page_range(file_path: str, page_numbers: List[int], backend: Optional[str] = None) -> List[str]:
+    # Runs in a worker process, so it opens its own reader
+    return get_backend(backend).extract_pages(file_path, page_numbers)
+
+
+def extract_pages(file_path: str, page_numbers: List[int], workers: int = 1,
+                  backend: Optional[str] = None) -> Dict[int, str]:
+    """
+    Extracts the text of the given pages, extracting every page exactly once.
+
+    Args:
+        file_path: The PDF file to read
+        page_numbers: Zero-based page indexes to extract
+        workers: Number of worker processes to spread the pages over (1 extracts in this process)
+        backend: Extraction backend name (see extract_backends; defaults to MBTI_EXTRACTION_BACKEND or PyPDF2)
+
+    Returns:
+        A dictionary mapping each requested page index to its extracted text.
+    """
+    if workers <= 1 or len(page_numbers) <= 1:
+        return dict(zip(page_numbers, _extract_page_range(file_path, page_numbers, backend)))
+
+    workers = min(workers, len(page_numbers))
+    chunks = [page_numbers[i::workers] for i in range(workers)]
+    page_texts = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk, texts in zip(chunks, executor.map(_extract_page_range, [file_path] * workers, chunks,
+                                                          [backend] * workers)):
+            page_texts.update(zip(chunk, texts))
+    return page_texts
+
+
+def clean_page_text(page_num: int, text: Optional[str],
+                    lines_to_remove_config: Dict[int, Union[str, List[int]]]) -> Optional[str]:
+    """
+    Removes the configured lines from one page's extracted text.
+
+    Returns:
+        The cleaned page text, or None if the page is dropped entirely.
+    """
+    config = lines_to_remove_config.get(page_num)
+    if config is None:
+        return text
+    if isinstance(config, list):
+        remove_lines = set(config)
+        return '\n'.join(line for i, line in enumerate(text.split('\n')) if i not in remove_lines)
+    return None
+
+
+def extract_cleaned_pages(file_path: str, lines_to_remove_config: Dict[int, Union[str, List[int]]],
+                          workers: int = 1, backend: Optional[str] = None) -> List[Page]:
+    """
+    Extracts and cleans a PDF in memory, without writing the _raw.txt and _cleaned.txt files.
+    Pages dropped entirely by the config are kept as empty pages so page numbers stay in place.
+    """
+    num_pages = get_backend(backend).page_count(file_path)
+    page_numbers = [page_num for page_num in range(num_pages) if lines_to_remove_config.get(page_num) != "ALL"]
+    page_texts = extract_pages(file_path, page_numbers, workers, backend)
+    pages = []
+    for page_num in range(num_pages):
+        cleaned_text = clean_page_text(page_num, page_texts.get(page_num), lines_to_remove_config)
+        pages.append(Page(page_num + 1, (cleaned_text or "").strip('\n')))
+    print(f"Extracted {num_pages} pages from {file_path}")
+    return pages
+
+
+def process_pdf_file(file_path: str, lines_to_remove_config: Dict[int, Union[str, List[int]]],
+                     output_dir: Optional[str] = None, workers: int = 1, write_raw: bool = True,
+                     backend: Optional[str] = None) -> str:
     base_name = os.path.splitext(os.path.basename(file_path))[0]
-    output_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(file_path))), "output")
+    if output_dir is None:
+        output_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(file_path))), "output")
     os.makedirs(output_dir, exist_ok=True)
 
     raw_output_path = os.path.join(output_dir, f"{base_name}_raw.txt")
     cleaned_output_path = os.path.join(output_dir, f"{base_name}_cleaned.txt")
 
     try:
-        with open(file_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            num_pages = len(pdf_reader.pages)
+        num_pages = get_backend(backend).page_count(file_path)
+
+        # Pages that are dropped entirely only need extracting for the raw output
+        page_numbers = [page_num for page_num in range(num_pages)
+                        if write_raw or lines_to_remove_config.get(page_num) != "ALL"]
+        page_texts = extract_pages(file_path, page_numbers, workers, backend)
 
-            # First, save the raw extracted text
+        # First, save the raw extracted text
+        if write_raw:
             with open(raw_output_path, 'w', encoding='utf-8') as raw_file:
                 for page_num in range(num_pages):
                     raw_file.write(f"--- Page {page_num + 1} ---\n")
-                    page = pdf_reader.pages[page_num]
-                    text = page.extract_text()
-                    raw_file.write(text + '\n\n')
+                    raw_file.write(page_texts[page_num] + '\n\n')
 
             print(f"Raw extracted text saved to: {raw_output_path}")
 
-            # Now process and save the cleaned text
-            with open(cleaned_output_path, 'w', encoding='utf-8') as cleaned_file:
-                for page_num in range(num_pages):
-                    cleaned_file.write(f"--- Page {page_num + 1} ---\n")
-
-                    if page_num in lines_to_remove_config:
-                        config = lines_to_remove_config[page_num]
-                        if config == "ALL":
-                            cleaned_file.write("\n")
-                            continue
-                        elif isinstance(config, list):
-                            page = pdf_reader.pages[page_num]
-                            text = page.extract_text().split('\n')
-                            text = [line for i, line in enumerate(text) if i not in config]
-                            cleaned_file.write('\n'.join(text) + '\n\n')
-                    else:
-                        page = pdf_reader.pages[page_num]
-                        text = page.extract_text()
-                        cleaned_file.write(text + '\n\n')
+        # Now process and save the cleaned text
+        with open(cleaned_output_path, 'w', encoding='utf-8') as cleaned_file:
+            for page_num in range(num_pages):
+                cleaned_file.write(f"--- Page {page_num + 1} ---\n")
+                cleaned_text = clean_page_text(page_num, page_texts.get(page_num), lines_to_remove_config)
+                cleaned_file.write("\n" if cleaned_text is None else cleaned_text + '\n\n')
 
         print(f"Cleaned text saved to: {cleaned_output_path}")
         return cleaned_output_path
@@ -1,62 +1,129 @@
-import re
+import io
 import chardet
+
 # from .utils import get_all_info, extract_mbti_qualities_scores
 # from .consts import MBTI_QUALITIES_HEBREW, fixed_text_data
 
+try:
+    from .report_document import ReportDocument, parse_page_delimiter
+    from .utils import join_pages
+except ImportError:
+    from report_document import ReportDocument, parse_page_delimiter
+    from utils import join_pages
+
+
+def _splice_page(lines, insertions, result_lines):
+    line_count_in_page = 0
+    for line in lines:
+        # A delimiter without a valid page number is kept but not counted as a line
+        if parse_page_delimiter(line) is not None:
+            result_lines.append(line)
+            continue
+
+        # Increment line count
+        line_count_in_page += 1
+
+        # Check if we need to insert fixed text before this line
+        if line_count_in_page in insertions:
+            text_to_insert = insertions[line_count_in_page]
+            if isinstance(text_to_insert, str) and "DELETE" in text_to_insert:
+                continue
+            result_lines.append(text_to_insert + '\n')
+
+        # Add the original line
+        result_lines.append(line)
+
+
+def _flush_page(page_num, lines, page_line_text_map, result_lines):
+    insertions = page_line_text_map.get(page_num)
+    if insertions:
+        _splice_page(lines, insertions, result_lines)
+    else:
+        result_lines.extend(lines)
 
-def insert_fixed_text(input_file, output_file, page_line_text_map):
+
+def splice_fixed_text(source, page_line_text_map):
+    """
+    Inserts the fixed text into page-structured text in memory.
+
+    Args:
+        source: The translated text, a ReportDocument, or a list of (page number, page text) tuples
+        page_line_text_map: {page: {line: text}} as returned by fixed_text_data. The text is inserted
+            before that line of the page (the first line after the delimiter is line 1); text
+            containing "DELETE" removes the line instead.
+
+    Returns:
+        The text with the fixed text inserted.
+    """
+    if isinstance(source, ReportDocument):
+        source = source.text
+    elif not isinstance(source, str):
+        source = join_pages(source)
+
+    result_lines = []
+    page_lines = []
+    current_page = 0
+    for line in io.StringIO(source).readlines():
+        page_num = parse_page_delimiter(line)
+        if page_num is None or page_num < 0:
+            page_lines.append(line)
+            continue
+        _flush_page(current_page, page_lines, page_line_text_map, result_lines)
+        # Add the page delimiter line to results
+        result_lines.append(line)
+        current_page = page_num
+        page_lines = []
+    _flush_page(current_page, page_lines, page_line_text_map, result_lines)
+    return "".join(result_lines)
+
+
+def read_text_with_detected_encoding(input_file, encoding=None):
+    """
+    Reads a text file as UTF-8 (or the given encoding). Only when that fails is the
+    encoding detected with chardet, which is slow on long files.
+    """
+    with open(input_file, 'rb') as f:
+        raw_data = f.read()
     try:
+        text = raw_data.decode(encoding or 'utf-8')
+    except UnicodeDecodeError:
+        if encoding is not None:
+            raise
         # Detect the file encoding
-        with open(input_file, 'rb') as f:
-            raw_data = f.read()
-        detected = chardet.detect(raw_data)
-        file_encoding = detected['encoding']
+        file_encoding = chardet.detect(raw_data)['encoding'] or 'utf-8'
         print(f"Detected encoding for input file: {file_encoding}")
+        text = raw_data.decode(file_encoding, errors='replace')
+    # Same newline handling as reading the file in text mode
+    return io.StringIO(text, newline=None).read()
 
-        # Read the file with the detected encoding
-        with open(input_file, 'r', encoding=file_encoding, errors='replace') as f:
-            lines = f.readlines()
-
-        current_page = 0
-        line_count_in_page = 0
-        result_lines = []
-
-        for line in lines:
-            # Check if this is a page delimiter line
-            if line.strip().startswith('--- Page ') and line.strip().endswith('---'):
-                # Extract the page number
-                try:
-                    page_str = line.strip().replace('--- Page ', '').replace(' ---', '')
-                    current_page = int(page_str)
-                    # Reset line count for the new page
-                    line_count_in_page = 0
-                except ValueError:
-                    pass
-
-                # Add the page delimiter line to results
-                result_lines.append(line)
-                continue
 
-            # Increment line count
-            line_count_in_page += 1
+def insert_fixed_text(input_file, output_file, page_line_text_map, encoding=None):
+    """
+    Inserts the fixed text and writes the result to output_file.
 
-            # Check if we need to insert fixed text before this line
-            if current_page in page_line_text_map and line_count_in_page in page_line_text_map[current_page]:
-                text_to_insert = page_line_text_map[current_page][line_count_in_page]
-                if isinstance(text_to_insert, str) and "DELETE" in text_to_insert:
-                    # print(f"Deleted line at Page {current_page}, Line {line_count_in_page}: {line.strip()[:30]}...")
-                    continue
-                else:
-                    result_lines.append(text_to_insert + '\n')
-                    # print(f"Inserted text at Page {current_page}, Line {line_count_in_page}: {text_to_insert[:30]}...")
+    Args:
+        input_file: Path of the translated text file, or a ReportDocument already in memory
+        output_file: Path of the output file, or None to only return the result
+        page_line_text_map: {page: {line: text}} as returned by fixed_text_data
+        encoding: Encoding of input_file. If not given, UTF-8 is tried before detecting it
 
-            # Add the original line
-            result_lines.append(line)
+    Returns:
+        The text with the fixed text inserted.
+    """
+    try:
+        if isinstance(input_file, ReportDocument):
+            text = input_file.text
+        else:
+            text = read_text_with_detected_encoding(input_file, encoding)
+
+        result = splice_fixed_text(text, page_line_text_map)
 
         # Write the modified content to the output file
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.writelines(result_lines)
-        print(f"Successfully processed the file. Output saved to {output_file}")
+        if output_file is not None:
+            with open(output_file, 'w', encoding='utf-8') as f:
+                f.write(result)
+            print(f"Successfully processed the file. Output saved to {output_file}")
+        return result
     except Exception as e:
         print(f"Error in insert_fixed_text: {str(e)}")
         raise
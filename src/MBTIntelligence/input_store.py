@@ -0,0 +1,195 @@
+import os
+import json
+import errno
+import shutil
+import hashlib
+import logging
+import threading
+from typing import Dict, Optional
+
+from .extract_backends import open_mapped
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_INPUT_STORE_DIR = os.path.join(ROOT_DIR, "input")
+# ioctl that clones a file's extents on Btrfs, XFS and other copy-on-write filesystems (fcntl.FICLONE in 3.12+)
+FICLONE = 0x40049409
+
+
+def mapped_sha256(path: str) -> str:
+    """SHA-256 of a file, hashed straight from a memory mapping of it."""
+    with open_mapped(path) as data:
+        return hashlib.sha256(data).hexdigest()
+
+
+def _reflink(source_path: str, target_path: str) -> bool:
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    with open(source_path, 'rb') as source, open(target_path, 'wb') as target:
+        try:
+            fcntl.ioctl(target.fileno(), getattr(fcntl, 'FICLONE', FICLONE), source.fileno())
+            return True
+        except OSError:
+            pass
+    os.remove(target_path)
+    return False
+
+
+def link_or_copy(source_path: str, target_path: str) -> str:
+    """
+    Puts source_path's content at target_path without copying the data where the filesystem
+    allows it. A reflink is tried first, since the clone stays unchanged when the original is
+    edited; then a hardlink, which shares the file itself; then a plain copy.
+
+    Returns:
+        How the file was stored: "reflink", "hardlink" or "copy".
+    """
+    if _reflink(source_path, target_path):
+        return "reflink"
+    try:
+        os.link(source_path, target_path)
+        return "hardlink"
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.EACCES, errno.EMLINK, errno.ENOTSUP):
+            raise
+    shutil.copyfile(source_path, target_path)
+    return "copy"
+
+
+class StoredInput:
+    """A PDF in the input store, and the report generated from it if there is one."""
+
+    def __init__(self, digest: str, path: str, name: str, report: Optional[str] = None):
+        self.digest = digest
+        self.path = path
+        self.name = name
+        self.report = report
+
+    @property
+    def processed(self) -> bool:
+        return self.report is not None
+
+
+class InputStore:
+    """
+    Content-addressed store for the submitted PDFs. Every file is kept once under the hash of
+    its content, so re-submitting an identical PDF is recognized before anything is processed
+    and is answered with the report already generated for it, and files with the same name
+    from different clients no longer overwrite each other.
+
+    Every stored PDF has a JSON record with the report name it was given (its file name,
+    with a short hash appended if another PDF already has that name) and its report.
+    Hardlinked files can still be changed through the original, so the size and modification
+    time are checked before a stored file is trusted.
+    """
+
+    def __init__(self, store_dir: str = DEFAULT_INPUT_STORE_DIR):
+        self.store_dir = store_dir
+        self._names = None
+        self._lock = threading.Lock()
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.store_dir, "objects", digest[:2], digest + ".pdf")
+
+    def _record_path(self, digest: str) -> str:
+        return os.path.join(self.store_dir, "records", digest[:2], digest + ".json")
+
+    def _write_record(self, digest: str, record: Dict[str, object]) -> None:
+        path = self._record_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _read_record(self, digest: str) -> Optional[Dict[str, object]]:
+        try:
+            with open(self._record_path(digest), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.warning(f"[WARNING] Ignoring invalid input record for {digest}: {e}")
+            return None
+
+    def _load_names(self) -> Dict[str, str]:
+        # Report name -> digest of every stored PDF, read once; callers hold self._lock
+        if self._names is None:
+            self._names = {}
+            records_dir = os.path.join(self.store_dir, "records")
+            if os.path.isdir(records_dir):
+                for shard in os.scandir(records_dir):
+                    if not shard.is_dir():
+                        continue
+                    for entry in os.scandir(shard.path):
+                        if entry.name.endswith(".json"):
+                            record = self._read_record(entry.name[:-len(".json")])
+                            if record is not None:
+                                self._names[record['name']] = entry.name[:-len(".json")]
+        return self._names
+
+    def _is_intact(self, digest: str, record: Dict[str, object]) -> bool:
+        try:
+            stat = os.stat(self._object_path(digest))
+        except FileNotFoundError:
+            return False
+        return stat.st_size == record['size'] and stat.st_mtime_ns == record['mtime_ns']
+
+    def _stored_input(self, digest: str, record: Dict[str, object]) -> StoredInput:
+        report = record.get('report')
+        if report is not None and not os.path.exists(report):
+            report = None
+        return StoredInput(digest, self._object_path(digest), record['name'], report)
+
+    def _store(self, digest: str, file_name: str, put_object) -> StoredInput:
+        with self._lock:
+            record = self._read_record(digest)
+            if record is not None and self._is_intact(digest, record):
+                return self._stored_input(digest, record)
+
+            names = self._load_names()
+            if record is not None:
+                # The stored file changed through a hardlink; the name and report still belong to this content
+                name = record['name']
+            else:
+                name = os.path.splitext(os.path.basename(file_name))[0] or "report"
+                if names.get(name, digest) != digest:
+                    name = f"{name}-{digest[:8]}"
+            object_path = self._object_path(digest)
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            tmp_path = f"{object_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            method = put_object(tmp_path)
+            os.replace(tmp_path, object_path)
+            stat = os.stat(object_path)
+            record = {'name': name, 'source': file_name, 'stored_by': method, 'size': stat.st_size,
+                      'mtime_ns': stat.st_mtime_ns, 'report': record.get('report') if record else None}
+            self._write_record(digest, record)
+            names[name] = digest
+        logging.info(f"[INFO] Stored {file_name} as {digest[:12]} ({method})")
+        return self._stored_input(digest, record)
+
+    def add_file(self, source_path: str) -> StoredInput:
+        """Stores a PDF from disk, or returns the stored copy if an identical one is already there."""
+        digest = mapped_sha256(source_path)
+        return self._store(digest, source_path, lambda tmp_path: link_or_copy(source_path, tmp_path))
+
+    def add_bytes(self, data: bytes, file_name: str) -> StoredInput:
+        """Stores an uploaded PDF, or returns the stored copy if an identical one is already there."""
+        digest = hashlib.sha256(data).hexdigest()
+
+        def write(tmp_path):
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            return "upload"
+
+        return self._store(digest, file_name, write)
+
+    def record_report(self, digest: str, report_path: str) -> None:
+        """Remembers the report generated from a stored PDF, to answer re-submissions with it."""
+        with self._lock:
+            record = self._read_record(digest)
+            if record is None:
+                return
+            record['report'] = os.path.abspath(report_path)
+            self._write_record(digest, record)
@@ -3,61 +3,192 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from PIL import Image, ImageTk
 import os
+import time
+import queue
 import asyncio
-import shutil
 import threading
 import sys
 import logging
-from datetime import datetime
-from .extract_text import process_pdf_file
-from .translation import translate_to_hebrew
-from .fixed_text import insert_fixed_text
-from .mbti_to_pdf import generate_mbti_report
-from .utils import get_all_info, extract_mbti_qualities_scores, format_mbti_string, get_formatted_type_qualities
-from .consts import fixed_text_data, lines_to_remove
+import webbrowser
+from collections import deque
+from .pipeline import run_pipeline
+from .input_store import InputStore
+from .metrics import current_report, report_context
+from .report_logging import setup_logging, add_log_handler, open_report_log, close_report_log
+
+# Lines kept in the console widget, and how often text written from other threads is shown
+CONSOLE_MAX_LINES = 2000
+CONSOLE_FLUSH_INTERVAL_MS = 100
+# Printed output is mirrored to the log through this logger, once per flush
+console_logger = logging.getLogger("MBTIntelligence.console")
+
+# Range and default of the "Parallel jobs" setting
+MAX_PARALLEL_JOBS = 8
+DEFAULT_PARALLEL_JOBS = 2
+# How often the job events queued by the event loop thread are applied and the elapsed times refreshed
+QUEUE_REFRESH_MS = 250
+# Progress of a job (in percent) when each stage starts; translation fills its range page by page
+STAGE_PROGRESS = {'extract': 0, 'translate': 10, 'fixed_text': 85, 'render': 90}
+STAGE_STATUS = {'extract': "Extracting text", 'translate': "Translating", 'fixed_text': "Inserting fixed text",
+                'render': "Rendering PDF"}
 
 
 class ConsoleRedirect:
-    def __init__(self, text_widget):
+    """
+    File-like sink for stdout and stderr that can be written from any thread. Writes are only
+    queued; the Tk thread moves them to the text widget in batches every flush_interval_ms,
+    and the widget keeps the last max_lines lines.
+    """
+
+    def __init__(self, text_widget, max_lines=CONSOLE_MAX_LINES, flush_interval_ms=CONSOLE_FLUSH_INTERVAL_MS):
         self.text_widget = text_widget
+        self.flush_interval_ms = flush_interval_ms
+        self.lines = deque(maxlen=max_lines)
+        self._pending = queue.SimpleQueue()
+        # Must be created on the Tk thread, which then keeps the flush timer running
+        self.text_widget.after(self.flush_interval_ms, self._flush_pending)
 
     def write(self, message):
+        # The report is taken here, the flush runs on the Tk thread outside of any report context
+        self._pending.put((message, True, current_report.get()))
+
+    def show(self, message):
+        # Display only, for text that is already in the log (see ConsoleLogHandler)
+        self._pending.put((message, False, None))
+
+    def flush(self):
+        pass
+
+    def _flush_pending(self):
+        chunks = []
+        mirrored = {}
+        while True:
+            try:
+                message, mirror, report_id = self._pending.get_nowait()
+            except queue.Empty:
+                break
+            chunks.append(message)
+            if mirror:
+                mirrored.setdefault(report_id, []).append(message)
+        if chunks:
+            self._display(''.join(chunks))
+        for report_id, messages in mirrored.items():
+            mirrored_text = ''.join(messages).strip()
+            if mirrored_text:
+                console_logger.info(mirrored_text, extra={'report_id': report_id})
+        try:
+            self.text_widget.after(self.flush_interval_ms, self._flush_pending)
+        except tk.TclError:
+            pass  # The window was closed
+
+    def _display(self, text):
+        new_lines = text.split('\n')
+        # The first piece continues the last line shown, which may not have ended yet
+        if self.lines:
+            new_lines[0] = self.lines.pop() + new_lines[0]
+        self.lines.extend(new_lines)
+
         self.text_widget.configure(state='normal')
-        self.text_widget.insert(tk.END, message)
+        if len(new_lines) >= self.lines.maxlen:
+            # Everything shown before has dropped out of the buffer
+            self.text_widget.delete('1.0', tk.END)
+            self.text_widget.insert(tk.END, '\n'.join(self.lines))
+        else:
+            self.text_widget.insert(tk.END, text)
+            excess = int(self.text_widget.index('end-1c').split('.')[0]) - self.lines.maxlen
+            if excess > 0:
+                self.text_widget.delete('1.0', f'{excess + 1}.0')
         self.text_widget.see(tk.END)
         self.text_widget.configure(state='disabled')
-        logging.info(message.strip())
 
-    def flush(self):
-        pass
+
+class ConsoleLogHandler(logging.Handler):
+    """Shows log records in the GUI console without mirroring them back into the log."""
+
+    def __init__(self, console):
+        super().__init__()
+        self.console = console
+
+    def emit(self, record):
+        if record.name == console_logger.name:
+            return  # Printed output, already on the console
+        try:
+            self.console.show(self.format(record) + '\n')
+        except Exception:
+            self.handleError(record)
+
+
+class ReportJob:
+    """A report in the GUI job queue. Only the Tk thread changes its fields."""
+
+    def __init__(self, pdf_path, name=None, file_name=None, digest=None):
+        self.pdf_path = pdf_path
+        self.name = name or os.path.splitext(os.path.basename(pdf_path))[0]
+        self.file_name = file_name or os.path.basename(pdf_path)
+        self.digest = digest
+        self.item = None
+        self.status = "Queued"
+        self.stage_status = None
+        self.progress = 0.0
+        self.page_count = 0
+        self.pages_translated = 0
+        self.started = None
+        self.finished = None
+        self.output_pdf = None
+        self.error = None
+
+    @property
+    def active(self):
+        return self.status not in ("Done", "Failed")
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}:{seconds:02d}"
 
 
 class MBTIProcessorGUI:
     def __init__(self, master):
         self.master = master
         master.title("MBTI Processor")
-        master.geometry("700x650")
+        master.geometry("760x780")
         master.configure(bg="#f7f7f7")
 
         # Get the root directory of the package
         self.root_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
         self.input_dir = os.path.join(self.root_dir, "input")
-        os.makedirs(self.input_dir, exist_ok=True)  # Create input directory if it doesn't exist
+        # Selected PDFs are kept by content hash, linked rather than copied where the filesystem allows
+        self.input_store = InputStore(self.input_dir)
 
-        self.file_path = None
-        self.input_file_path = None
-        self.cleaned_text_path = None
-        self.translated_text_path = None
-        self.fixed_text_path = None
-        self.output_pdf_path = None
+        self.output_dir = os.path.join(self.root_dir, "output")
+        self.logo_path = os.path.join(self.root_dir, "media", "full_logo.png")
+        self.keep_intermediates = False
+
+        # The job queue; jobs are started from the Tk thread and run on one shared event loop thread
+        self.jobs = []
+        # (handler, args) events of the running jobs, queued by the event loop thread and applied by refresh_queue
+        self.job_events = queue.SimpleQueue()
+        self.processing = False
+        self.processing_started = None
+        self.loop = None
 
         self.create_widgets()
 
         # Redirect stdout and stderr to GUI console
         self.original_stdout = sys.stdout
         self.original_stderr = sys.stderr
-        sys.stdout = ConsoleRedirect(self.console_text)
-        sys.stderr = ConsoleRedirect(self.console_text)
+        self.console = ConsoleRedirect(self.console_text)
+        sys.stdout = self.console
+        sys.stderr = self.console
+        # Once per process; the report log files are opened and closed per report
+        setup_logging()
+        add_log_handler(ConsoleLogHandler(self.console))
 
     def create_widgets(self):
         # Logo
@@ -81,10 +212,10 @@ class MBTIProcessorGUI:
         style = ttk.Style()
         style.configure("TButton", font=("Helvetica", 12), padding=10)
 
-        self.upload_btn = ttk.Button(button_frame, text="📄 Upload File", command=self.select_file)
+        self.upload_btn = ttk.Button(button_frame, text="📄 Upload Files", command=self.select_file)
         self.upload_btn.grid(row=0, column=0, padx=10)
 
-        self.generate_btn = ttk.Button(button_frame, text="⚙️ Generate Report", command=self.start_processing,
+        self.generate_btn = ttk.Button(button_frame, text="⚙️ Generate Reports", command=self.start_processing,
                                        state=tk.DISABLED)
         self.generate_btn.grid(row=0, column=1, padx=10)
 
@@ -92,8 +223,43 @@ class MBTIProcessorGUI:
                                    state=tk.DISABLED)
         self.open_btn.grid(row=0, column=2, padx=10)
 
-        # Progress Bar
-        self.progress = ttk.Progressbar(self.master, orient="horizontal", length=500, mode="indeterminate")
+        options_frame = tk.Frame(self.master, bg="#f7f7f7")
+        options_frame.pack()
+
+        # How many reports are processed at once; read whenever a job is started, so it can change mid-queue
+        tk.Label(options_frame, text="Parallel jobs:", font=("Helvetica", 9), bg="#f7f7f7").pack(side="left")
+        self.parallel_jobs_var = tk.IntVar(value=DEFAULT_PARALLEL_JOBS)
+        parallel_jobs_spinbox = ttk.Spinbox(options_frame, from_=1, to=MAX_PARALLEL_JOBS, width=3,
+                                            textvariable=self.parallel_jobs_var, state="readonly")
+        parallel_jobs_spinbox.pack(side="left", padx=(5, 20))
+
+        # Debug option: also write the intermediate text and HTML files to the output folder
+        self.keep_intermediates_var = tk.BooleanVar(value=False)
+        keep_intermediates_check = tk.Checkbutton(options_frame, text="Keep intermediate files",
+                                                  variable=self.keep_intermediates_var, font=("Helvetica", 9),
+                                                  bg="#f7f7f7")
+        keep_intermediates_check.pack(side="left")
+
+        # Job Queue
+        queue_frame = tk.LabelFrame(self.master, text="Reports", font=("Helvetica", 10), bg="#f7f7f7", fg="#333")
+        queue_frame.pack(padx=20, pady=10, fill="both", expand=True)
+
+        self.job_list = ttk.Treeview(queue_frame, columns=("file", "status", "progress", "elapsed"),
+                                     show="headings", height=8)
+        for column, heading, width in (("file", "File", 260), ("status", "Status", 220),
+                                       ("progress", "Progress", 80), ("elapsed", "Time", 70)):
+            self.job_list.heading(column, text=heading)
+            self.job_list.column(column, width=width, anchor="w" if column in ("file", "status") else "center")
+        self.job_list.pack(side="left", fill="both", expand=True)
+        # Double click a finished report to open it
+        self.job_list.bind("<Double-1>", self.open_selected_report)
+
+        job_scrollbar = ttk.Scrollbar(queue_frame, command=self.job_list.yview)
+        job_scrollbar.pack(side="right", fill="y")
+        self.job_list['yscrollcommand'] = job_scrollbar.set
+
+        # Progress Bar (reports done out of all the reports in the queue)
+        self.progress = ttk.Progressbar(self.master, orient="horizontal", length=500, mode="determinate")
         self.progress.pack(pady=10)
 
         # Status Label
@@ -118,154 +284,230 @@ class MBTIProcessorGUI:
                           font=("Helvetica", 8), bg="#f7f7f7", anchor="w", justify="left")
         footer.place(relx=0.01, rely=0.98, anchor="sw")
 
-    def setup_logging(self, filename):
-        log_dir = os.path.join(self.root_dir, "logs")
-        os.makedirs(log_dir, exist_ok=True)
-        
-        timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-        log_filename = f"{filename}-{timestamp}-log.txt"
-        log_path = os.path.join(log_dir, log_filename)
-        
-        logging.basicConfig(
-            filename=log_path,
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        
-        # Also log to console
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        logging.getLogger().addHandler(console_handler)
-        
-        return log_path
-
-    def update_log_filename(self, log_path, status):
+    def update_log_filename(self, filename, log_path, status):
+        # The file has to be closed before it can be renamed (on Windows in particular)
+        close_report_log(filename)
         new_log_path = log_path.replace("-log.txt", f"-{status}-log.txt")
         os.rename(log_path, new_log_path)
         logging.info(f"Log file renamed to: {new_log_path}")
 
     def select_file(self):
-        self.file_path = filedialog.askopenfilename(filetypes=[("PDF files", "*.pdf")])
-        if self.file_path:
-            # Copy the selected file to the input directory
-            input_filename = os.path.basename(self.file_path)
-            self.input_file_path = os.path.join(self.input_dir, input_filename)
-            shutil.copy2(self.file_path, self.input_file_path)
-
-            self.generate_btn['state'] = tk.NORMAL
-            self.status_label.config(text=f"Selected file: {input_filename}")
-            logging.info(f"File uploaded: {self.file_path}")
-            logging.info(f"File copied to: {self.input_file_path}")
-        else:
+        file_paths = self.master.tk.splitlist(filedialog.askopenfilenames(filetypes=[("PDF files", "*.pdf")]))
+        if not file_paths:
             self.status_label.config(text="Upload canceled")
             logging.info("File upload canceled.")
+            return
+
+        for file_path in file_paths:
+            input_filename = os.path.basename(file_path)
+            try:
+                stored = self.input_store.add_file(file_path)
+            except OSError as e:
+                logging.error(f"Could not read {file_path}: {e}")
+                continue
+            if any(queued.digest == stored.digest and queued.active for queued in self.jobs):
+                logging.warning(f"{input_filename} is already in the queue, skipped")
+                continue
+
+            # The output and log file are named after the report; the store gives same-named files distinct names
+            job = ReportJob(stored.path, stored.name, input_filename, stored.digest)
+            if stored.processed:
+                # An identical PDF was processed before, its report is reused as it is
+                job.status = "Done"
+                job.progress = 100.0
+                job.output_pdf = stored.report
+                self.open_btn['state'] = tk.NORMAL
+                logging.info(f"{input_filename} was already processed: {stored.report}")
+            job.item = self.job_list.insert('', tk.END, values=(input_filename, job.status, "", ""))
+            self.update_job_row(job)
+            self.jobs.append(job)
+            logging.info(f"File uploaded: {file_path}")
+            logging.info(f"File stored as: {job.pdf_path}")
+
+        if self.processing:
+            self.dispatch_jobs()
+        elif any(job.status == "Queued" for job in self.jobs):
+            self.generate_btn['state'] = tk.NORMAL
+        self.update_queue_status()
 
     def start_processing(self):
         self.generate_btn['state'] = tk.DISABLED
-        self.upload_btn['state'] = tk.DISABLED
-        self.progress.start(10)
-        self.status_label.config(text="Processing MBTI report...")
-
-        # Start processing in a separate thread to keep UI responsive
-        threading.Thread(target=self.process_report_thread).start()
-
-    def process_report_thread(self):
-        filename = os.path.splitext(os.path.basename(self.input_file_path))[0]
-        log_path = self.setup_logging(filename)
-        
+        self.keep_intermediates = self.keep_intermediates_var.get()
+        if self.loop is None:
+            # A single loop runs every job, so they share the translation client and its rate limits
+            self.loop = asyncio.new_event_loop()
+            threading.Thread(target=self.loop.run_forever, daemon=True).start()
+
+        self.processing = True
+        self.processing_started = time.monotonic()
+        self.dispatch_jobs()
+        self.refresh_queue()
+
+    def parallel_jobs(self):
         try:
-            asyncio.run(self.process_report())
-            logging.info("Processing completed successfully")
-            self.update_log_filename(log_path, "success")
-        except Exception as e:
-            logging.error(f"An error occurred during processing: {str(e)}", exc_info=True)
-            self.update_log_filename(log_path, "crash")
-            self.master.after(0, lambda: messagebox.showerror("Error", f"An error occurred during processing: {str(e)}"))
-        finally:
-            self.master.after(0, self.processing_complete)
+            return max(1, min(MAX_PARALLEL_JOBS, self.parallel_jobs_var.get()))
+        except tk.TclError:
+            return DEFAULT_PARALLEL_JOBS
+
+    def dispatch_jobs(self):
+        """Starts queued jobs until the parallel jobs limit is reached (Tk thread only)."""
+        running = sum(1 for job in self.jobs if job.status == "Running")
+        for job in self.jobs:
+            if running >= self.parallel_jobs():
+                break
+            if job.status != "Queued":
+                continue
+            job.status = "Running"
+            job.started = time.monotonic()
+            running += 1
+            self.update_job_row(job)
+            future = asyncio.run_coroutine_threadsafe(self.process_report(job), self.loop)
+            future.add_done_callback(lambda future, job=job: self.job_events.put((self.job_finished, (job, future))))
+
+    def job_finished(self, job, future):
+        job.finished = time.monotonic()
+        error = future.exception()
+        if error is None:
+            job.status = "Done"
+            job.progress = 100.0
+            job.output_pdf = future.result()
+            self.open_btn['state'] = tk.NORMAL
+        else:
+            job.status = "Failed"
+            job.error = str(error)
+        self.update_job_row(job)
+        self.dispatch_jobs()
+        self.update_queue_status()
+
+    def apply_job_events(self):
+        # The event loop thread never calls into Tk itself, so a closed window cannot fail or hold up the jobs
+        while True:
+            try:
+                handler, args = self.job_events.get_nowait()
+            except queue.Empty:
+                return
+            handler(*args)
+
+    def refresh_queue(self):
+        # Applies the job events and keeps the elapsed times and the ETA current between them
+        self.apply_job_events()
+        for job in self.jobs:
+            if job.status == "Running":
+                self.update_job_row(job)
+        self.update_queue_status()
+        if any(job.active for job in self.jobs):
+            self.master.after(QUEUE_REFRESH_MS, self.refresh_queue)
+        else:
+            self.processing_complete()
+
+    def update_job_row(self, job):
+        status = job.status
+        if job.status == "Failed":
+            status = f"Failed: {job.error}"
+        elif job.status == "Running":
+            status = job.stage_status or "Starting"
+        progress = f"{job.progress:.0f}%" if job.status != "Queued" else ""
+        elapsed = format_duration(job.elapsed) if job.started is not None else ""
+        self.job_list.item(job.item, values=(job.file_name, status, progress, elapsed))
+
+    def queue_eta(self):
+        """Seconds until the queue is drained, from the mean time of the reports done so far."""
+        # Reports reused from an earlier run took no time here
+        done = [job for job in self.jobs if job.status == "Done" and job.started is not None]
+        if not done:
+            return None
+        mean_time = sum(job.elapsed for job in done) / len(done)
+        running = [job for job in self.jobs if job.status == "Running"]
+        queued = sum(1 for job in self.jobs if job.status == "Queued")
+        remaining = sum(mean_time * (100.0 - job.progress) / 100.0 for job in running) + mean_time * queued
+        return remaining / max(1, min(self.parallel_jobs(), len(running) + queued))
+
+    def update_queue_status(self):
+        total = len(self.jobs)
+        done = sum(1 for job in self.jobs if job.status == "Done")
+        failed = sum(1 for job in self.jobs if job.status == "Failed")
+        in_progress = sum(job.progress for job in self.jobs if job.status == "Running") / 100.0
+        self.progress['maximum'] = max(total, 1)
+        self.progress['value'] = done + failed + in_progress
+        if not self.processing:
+            queued = sum(1 for job in self.jobs if job.status == "Queued")
+            self.status_label.config(text=f"{queued} report(s) queued" if queued else "Ready")
+            return
+
+        text = f"{done + failed} of {total} report(s) processed"
+        if failed:
+            text += f", {failed} failed"
+        if any(job.active for job in self.jobs):
+            eta = self.queue_eta()
+            text += f" - about {format_duration(eta)} left" if eta is not None else " - estimating time left..."
+        self.status_label.config(text=text)
 
     def processing_complete(self):
-        self.progress.stop()
-        self.upload_btn['state'] = tk.NORMAL
-        self.generate_btn['state'] = tk.NORMAL
-        self.open_btn['state'] = tk.NORMAL
-
-    async def process_report(self):
-        try:
-            logging.info("[PROCESS] Starting MBTI report processing...")
-
-            # Step 1: Extract Text
-            logging.info("[PROCESS] Step 1: Extracting text from PDF...")
-            self.cleaned_text_path = process_pdf_file(self.file_path, lines_to_remove)
-            logging.info(self.cleaned_text_path)
-            cleaned_text_path_str = str(self.cleaned_text_path)
-            logging.info(cleaned_text_path_str)
-            if cleaned_text_path_str == "None" or not os.path.exists(cleaned_text_path_str):
-                raise ValueError(
-                    f"PDF processing failed. No output file was generated at expected path: {cleaned_text_path_str}")
-            logging.info(f"[INFO] Text extracted successfully: {self.cleaned_text_path}")
-
-            # Step 2: Translate to Hebrew
-            logging.info("[PROCESS] Step 2: Translating text to Hebrew...")
-            with open(self.cleaned_text_path, 'r', encoding='utf-8') as f:
-                text = f.read()
-                logging.info(text)
-            translated_text = await translate_to_hebrew(text)
-            logging.info("translated text:\n" + translated_text)
-            if translated_text is None:
-                raise ValueError("Translation failed. No Hebrew text was generated.")
-
-            output_dir = os.path.join(self.root_dir, "output")
-            os.makedirs(output_dir, exist_ok=True)
-            output_filename = os.path.splitext(os.path.basename(self.input_file_path))[0] + "_hebrew.txt"
-            self.translated_text_path = os.path.join(output_dir, output_filename)
-            with open(self.translated_text_path, 'w', encoding='utf-8') as f:
-                f.write(translated_text)
-            logging.info(f"[INFO] Translation completed: {self.translated_text_path}")
-
-            # Step 3: Insert Fixed Text
-            logging.info("[PROCESS] Step 3: Inserting fixed text...")
-            mbti_info = get_all_info(self.translated_text_path)
-            logging.info(str(mbti_info))  # Log the info dictionary
-            mbti_type = mbti_info['type']  # Get the MBTI type from the info dictionary
-            logging.info(mbti_type)
-            mbti_type_qualities = get_formatted_type_qualities(mbti_type)  # Pass the type, not the file path
-            logging.info(mbti_type_qualities)
-            # mbti_string = format_mbti_string(mbti_qualities)
-            fixed_text_config = fixed_text_data(mbti_info, mbti_type_qualities)
-            output_filename = os.path.splitext(os.path.basename(self.input_file_path))[0] + "_fixed.txt"
-            self.fixed_text_path = os.path.join(output_dir, output_filename)
-            insert_fixed_text(self.translated_text_path, self.fixed_text_path, fixed_text_config)
-            logging.info(f"[INFO] Fixed text inserted: {self.fixed_text_path}")
-
-            # Step 4: Generate PDF
-            logging.info("[PROCESS] Step 4: Generating final PDF report...")
-            output_html = os.path.join(output_dir,os.path.splitext(os.path.basename(self.input_file_path))[0] + "_report.html")
-            output_pdf = os.path.join(output_dir,
-                                      os.path.splitext(os.path.basename(self.input_file_path))[0] + "_report.pdf")
-            logo_path = os.path.join(self.root_dir, "media", "full_logo.png")
-            first_page_title = "דו&quot;ח בתרגום לעברית עבור: "
-            if not os.path.exists(logo_path):
-                raise FileNotFoundError(f"Logo file not found at {logo_path}")
-            generate_mbti_report(self.fixed_text_path, output_html, output_pdf, logo_path, first_page_title)
-            if not os.path.exists(output_pdf):
-                raise FileNotFoundError(f"Final PDF was not generated at {output_pdf}")
-
-            # Store the output PDF path for later use
-            self.output_pdf_path = output_pdf
-            logging.info(f"[SUCCESS] PDF report generated successfully: {output_pdf}")
-            self.status_label.config(text="Report generated successfully!")
-            self.master.after(0, lambda: messagebox.showinfo("Success",
-                                                             f"MBTI report processed successfully!\nOutput PDF: {output_pdf}"))
-        except Exception as e:
-            logging.error(f"[ERROR] {str(e)}")
-            self.master.after(0,
-                              lambda: messagebox.showerror("Error", f"An error occurred during processing: {str(e)}"))
+        self.processing = False
+        self.generate_btn['state'] = tk.NORMAL if any(job.status == "Queued" for job in self.jobs) else tk.DISABLED
+        self.update_queue_status()
+        # Only the reports of this run, earlier ones stay listed in the queue
+        finished = [job for job in self.jobs if job.finished is not None and job.finished >= self.processing_started]
+        done = sum(1 for job in finished if job.status == "Done")
+        failed = [job for job in finished if job.status == "Failed"]
+        if failed:
+            messagebox.showerror("Error", f"{done} report(s) processed, {len(failed)} failed:\n" +
+                                 "\n".join(f"{job.name}: {job.error}" for job in failed))
+        else:
+            messagebox.showinfo("Success", f"{done} MBTI report(s) processed successfully!\n"
+                                           f"Output folder: {self.output_dir}")
+
+    async def process_report(self, job):
+        loop = asyncio.get_running_loop()
+        status = "crash"
+        # Records logged in this context, including by the pipeline, go to the report's own log file
+        with report_context(job.name):
+            log_path = open_report_log(job.name)
+            try:
+                logging.info("[PROCESS] Starting MBTI report processing...")
+                # Pages are handed from stage to stage in memory; the text files are only written on request
+                output_pdf = await run_pipeline(
+                    job.pdf_path, self.output_dir, self.logo_path, keep_intermediates=self.keep_intermediates,
+                    on_page=lambda page: self.job_events.put((self.page_translated, (job, page))),
+                    on_stage=lambda stage, page_count: self.job_events.put((self.stage_started,
+                                                                            (job, stage, page_count))),
+                    report_name=job.name)
+                if job.digest is not None:
+                    self.input_store.record_report(job.digest, output_pdf)
+                logging.info("Processing completed successfully")
+                status = "success"
+                return output_pdf
+            except Exception as e:
+                logging.error(f"An error occurred during processing: {str(e)}", exc_info=True)
+                raise
+            finally:
+                # Closing the log waits for the log listener, which should not hold up the other jobs
+                await loop.run_in_executor(None, self.update_log_filename, job.name, log_path, status)
+
+    def stage_started(self, job, stage, page_count):
+        job.page_count = page_count
+        job.progress = STAGE_PROGRESS[stage]
+        job.stage_status = STAGE_STATUS[stage]
+        if stage == 'translate':
+            job.stage_status += f" 0/{page_count} pages"
+        self.update_job_row(job)
+
+    def page_translated(self, job, page):
+        job.pages_translated += 1
+        translate_range = STAGE_PROGRESS['fixed_text'] - STAGE_PROGRESS['translate']
+        job.progress = STAGE_PROGRESS['translate'] + translate_range * min(1.0, job.pages_translated / job.page_count)
+        job.stage_status = f"{STAGE_STATUS['translate']} {job.pages_translated}/{job.page_count} pages"
+        self.update_job_row(job)
+
+    def open_selected_report(self, event):
+        item = self.job_list.identify_row(event.y)
+        for job in self.jobs:
+            if job.item == item and job.output_pdf:
+                webbrowser.open(f'file://{os.path.abspath(job.output_pdf)}')
 
     def open_output_folder(self):
         """Open the output folder in file explorer"""
-        output_dir = os.path.join(self.root_dir, "output")
+        output_dir = self.output_dir
         if os.path.exists(output_dir):
             if sys.platform == 'win32':
                 os.startfile(output_dir)
@@ -280,10 +522,6 @@ class MBTIProcessorGUI:
             messagebox.showerror("Error", f"Output directory does not exist: {output_dir}")
             logging.error(f"[ERROR] Output directory does not exist: {output_dir}")
 
-    def process_report_wrapper(self):
-        """Legacy method for backward compatibility"""
-        asyncio.run(self.process_report())
-
     if __name__ == "__main__":
         root = tk.Tk()
         gui = MBTIProcessorGUI(root)
@@ -1,66 +1,25 @@
 import os
 import re
 import pathlib
+import operator
+import threading
 import webbrowser
-from weasyprint import HTML
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from weasyprint import HTML, CSS
+from weasyprint.text.fonts import FontConfiguration
 
+try:
+    from .report_document import ReportDocument
+    from .assets import prepare_logo, prepare_report_fonts, REPORT_FONT_FAMILY
+except ImportError:
+    from report_document import ReportDocument
+    from assets import prepare_logo, prepare_report_fonts, REPORT_FONT_FAMILY
 
-def generate_mbti_report(input_file, output_html, output_pdf, logo_path, first_title):
-    # File paths
-    header_image_url = pathlib.Path(logo_path).absolute().as_uri()
-
-    # Read and split text
-    with open(input_file, 'r', encoding='utf-8') as f:
-        text = f.read()
-
-    pages = [p.strip() for p in text.split('--- Page ') if p.strip() and not p.strip().isdigit()]
-    total_pages = len(pages)
-
-    # Footer static text
-    footer_static_text = 'All rights reserved. TEMBTI-Intelligence©.'
-
-    # Build HTML
-    html_content = generate_html_content(header_image_url, pages, total_pages, footer_static_text, first_title)
-
-    # Save HTML
-    with open(output_html, 'w', encoding='utf-8') as f:
-        f.write(html_content)
-
-    # Generate PDF
-    HTML(output_html).write_pdf(output_pdf)
-
-    # Open HTML and PDF
-    webbrowser.open(f'file://{os.path.abspath(output_html)}')
-    webbrowser.open(f'file://{os.path.abspath(output_pdf)}')
-
-    print("✅ MBTI report generated with page titles and numbers.")
+# Footer static text
+FOOTER_STATIC_TEXT = 'All rights reserved. TEMBTI-Intelligence©.'
 
-
-def apply_formatting(text):
-    # Bold and underline formatting
-    text = re.sub(r'__\*\*(.*?)\*\*__', r'<b><u>\1</u></b>', text)
-
-    # Bold formatting
-    text = re.sub(r'\*\*(.*?)\*\*', r'<b>\1</b>', text)
-
-    # Underline formatting
-    text = re.sub(r'__(.*?)__', r'<u>\1</u>', text)
-
-    # Replace newlines with <br> tags
-    text = text.replace('\n', '<br>')
-
-    return text
-
-
-def generate_html_content(header_image_url, pages, total_pages, footer_static_text, first_page_title):
-    current_time = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-    html_head = f"""
-    <!DOCTYPE html>
-    <html lang="he" dir="rtl">
-    <head>
-        <meta charset="UTF-8">
-        <style>
+# Report stylesheet; doubled braces are literal CSS braces for str.format
+REPORT_CSS = """{font_faces}
             @page {{
                 size: A4;
                 margin: 120px 60px 80px 60px;
@@ -79,7 +38,7 @@ def generate_html_content(header_image_url, pages, total_pages, footer_static_te
                 content: none;}}
             }}
             body {{
-                font-family: 'Arial', sans-serif;
+                font-family: '{font_family}', 'Arial', sans-serif;
                 direction: rtl;
                 font-size: 16px;
                 line-height: 1.8;
@@ -113,44 +72,256 @@ def generate_html_content(header_image_url, pages, total_pages, footer_static_te
                 text-decoration: underline;
                 padding-bottom: 10px;
             }}
-        </style>
+        """
+
+
+STYLE_TEMPLATE = "<style>{css}</style>"
+HTML_HEAD_TEMPLATE = """
+    <!DOCTYPE html>
+    <html lang="he" dir="rtl">
+    <head>
+        <meta charset="UTF-8">
+        {style}
     </head>
     <body>
     """
-
-    html_body = ""
-    page_count = 1
-    for index, page in enumerate(pages):
-        page_content = re.sub(r'^\d+\s+---\s*', '', page).replace('\n', '<br>')
-        page_content = apply_formatting(page_content)
-        
-        # Skip empty pages
-        if not page_content.strip():
-            continue
-
-        if index == 0:
-            html_body += f"""
+# One fixed header for the whole document; WeasyPrint repeats fixed boxes on every page
+HEADER_TEMPLATE = """
+            <header><img src="{header_image_url}" alt="Header Image"></header>
+            """
+FIRST_PAGE_TEMPLATE = """
             <div class="page first-page">
-                <header><img src="{header_image_url}" alt="Header Image"></header>
                 <main>
                     <div class="first-page-title">{first_page_title}</div><p>{page_content}</p>
                 </main>
             </div>
             """
-        else:
-            html_body += f"""
+PAGE_TEMPLATE = """
             <div class="page page-{page_count}">
-                <header><img src="{header_image_url}" alt="Header Image"></header>
                 <main>
                     <p>{page_content}</p>
                 </main>
             </div>
             """
-        page_count += 1
+HTML_FOOTER = "</body></html>"
+
+# Page number left at the start of a page string by split_report_pages
+PAGE_NUMBER_PREFIX_PATTERN = re.compile(r'^\d+\s+---\s*')
+# Applied in this order, each rule on the result of the previous one:
+# (opener, closer, opening tags, closing tags)
+MARKUP_RULES = (
+    ('__**', '**__', '<b><u>', '</u></b>'),
+    ('**', '**', '<b>', '</b>'),
+    ('__', '__', '<u>', '</u>'),
+)
+
+
+FONT_FACE_TEMPLATE = """
+            @font-face {{
+                font-family: '{font_family}';
+                src: url('{font_url}') format('truetype');
+                font-weight: {font_weight};
+            }}"""
+
+
+def report_font_faces():
+    # The bundled font, cut to the weights and glyphs the report uses; Arial is the fallback
+    try:
+        font_paths = prepare_report_fonts()
+    except Exception as e:
+        print(f"Warning: could not prepare the report font, falling back to Arial: {e}")
+        return ""
+    return ''.join(FONT_FACE_TEMPLATE.format(font_family=REPORT_FONT_FAMILY,
+                                             font_url=pathlib.Path(font_path).absolute().as_uri(),
+                                             font_weight=weight)
+                   for weight, font_path in font_paths.items())
+
+
+def report_css(footer_static_text=FOOTER_STATIC_TEXT):
+    return REPORT_CSS.format(footer_static_text=footer_static_text, font_faces=report_font_faces(),
+                             font_family=REPORT_FONT_FAMILY)
+
+
+def logo_url(logo_path):
+    # The logo scaled down to print resolution, instead of the full size source image
+    return pathlib.Path(prepare_logo(logo_path)).absolute().as_uri()
+
+
+def split_report_pages(text):
+    return [p.strip() for p in text.split('--- Page ') if p.strip() and not p.strip().isdigit()]
+
 
-    html_footer = "</body></html>"
+def build_report_html(pages, logo_path, first_title, inline_css=True):
+    """
+    Builds the report HTML from (page number, page text) tuples, e.g. the output of split_pages.
+    Without inline_css the stylesheet is left out, for rendering with ReportRenderer.
+    """
+    header_image_url = logo_url(logo_path)
+    # Same page strings split_report_pages produces from the page-structured text
+    page_strings = [f"{page_num} ---\n{page_text}".strip() for page_num, page_text in pages]
+    return generate_html_content(header_image_url, page_strings, len(page_strings), FOOTER_STATIC_TEXT,
+                                 first_title, inline_css)
+
+
+class ReportRenderer:
+    """
+    Renders report HTML to PDF, keeping the expensive state between reports: the report
+    stylesheet is parsed once against a shared FontConfiguration, and decoded images such
+    as the logo stay in the image cache. One renderer is meant to live as long as its process.
+    """
+
+    def __init__(self, footer_static_text=FOOTER_STATIC_TEXT):
+        self.font_config = FontConfiguration()
+        self.stylesheet = CSS(string=report_css(footer_static_text), font_config=self.font_config)
+        self.image_cache = {}
+        self.rendered = 0
+        # WeasyPrint documents are not safe to lay out concurrently with shared font state
+        self._lock = threading.Lock()
+
+    def render(self, html_content, output_pdf):
+        # The HTML must not carry its own <style> block (see build_report_html), or it is applied twice
+        with self._lock:
+            HTML(string=html_content).write_pdf(output_pdf, stylesheets=[self.stylesheet],
+                                                font_config=self.font_config, cache=self.image_cache)
+            self.rendered += 1
+        return output_pdf
+
+    def render_pages(self, pages, output_pdf, logo_path, first_title, output_html=None):
+        """
+        Renders (page number, page text) tuples to output_pdf. The standalone HTML, with the
+        stylesheet inlined, is only written when output_html is given.
+        """
+        if output_html is not None:
+            with open(output_html, 'w', encoding='utf-8') as f:
+                f.write(build_report_html(pages, logo_path, first_title))
+        return self.render(build_report_html(pages, logo_path, first_title, inline_css=False), output_pdf)
+
+
+_renderer = None
+
+
+def get_renderer():
+    """Returns the renderer of the current process, creating it on first use."""
+    global _renderer
+    if _renderer is None:
+        _renderer = ReportRenderer()
+    return _renderer
+
+
+def init_render_worker():
+    # Pool initializer: parses the stylesheet and loads the fonts before the first report arrives
+    get_renderer()
+
+
+def create_render_pool(workers=None):
+    """
+    Creates a pool of long-lived worker processes, each holding its own ReportRenderer.
+    Functions submitted to the pool render through get_renderer().
+    """
+    return ProcessPoolExecutor(max_workers=workers, initializer=init_render_worker)
+
+
+def generate_mbti_report(input_file, output_html, output_pdf, logo_path, first_title, open_in_browser=True):
+    # File paths
+    header_image_url = logo_url(logo_path)
+
+    # Read and split text
+    if isinstance(input_file, ReportDocument):
+        text = input_file.text
+    else:
+        with open(input_file, 'r', encoding='utf-8') as f:
+            text = f.read()
+
+    pages = split_report_pages(text)
+    total_pages = len(pages)
+
+    # Save HTML
+    if output_html is not None:
+        html_content = generate_html_content(header_image_url, pages, total_pages, FOOTER_STATIC_TEXT, first_title)
+        with open(output_html, 'w', encoding='utf-8') as f:
+            f.write(html_content)
+
+    # Generate PDF, with the stylesheet applied by the process-wide renderer
+    html_content = generate_html_content(header_image_url, pages, total_pages, FOOTER_STATIC_TEXT, first_title,
+                                         inline_css=False)
+    get_renderer().render(html_content, output_pdf)
+
+    # Open HTML and PDF
+    if open_in_browser:
+        if output_html is not None:
+            webbrowser.open(f'file://{os.path.abspath(output_html)}')
+        webbrowser.open(f'file://{os.path.abspath(output_pdf)}')
+
+    print("✅ MBTI report generated with page titles and numbers.")
+
+
+def _pair_markers(line, opener, closer, open_tag, close_tag):
+    """
+    Same result as re.sub(opener + '(.*?)' + closer) on a line without newlines: openers are
+    taken leftmost and closed by the next closer, and an opener without a closer is left as it is.
+    """
+    if opener == closer:
+        # Consecutive markers pair up, so one split finds them all
+        pieces = line.split(opener)
+        markers = len(pieces) - 1
+        if not markers:
+            return line
+        tags = (open_tag, close_tag) * (markers // 2) + (opener,) * (markers % 2)
+        return pieces[0] + ''.join(map(operator.add, tags, pieces[1:]))
+
+    parts = []
+    pos = 0
+    while True:
+        start = line.find(opener, pos)
+        if start < 0:
+            break
+        end = line.find(closer, start + len(opener))
+        if end < 0:
+            break
+        parts += [line[pos:start], open_tag, line[start + len(opener):end], close_tag]
+        pos = end + len(closer)
+    if not parts:
+        return line
+    parts.append(line[pos:])
+    return ''.join(parts)
+
+
+def _format_line(line):
+    # Each rule works on the result of the previous one, like the regex passes it replaces
+    for opener, closer, open_tag, close_tag in MARKUP_RULES:
+        if opener in line:
+            line = _pair_markers(line, opener, closer, open_tag, close_tag)
+    return line
+
+
+def apply_formatting(text):
+    # Bold and underline, bold, then underline formatting; markup does not span lines
+    if '\n' not in text:
+        return _format_line(text)
+    # Replace newlines with <br> tags
+    return '<br>'.join([_format_line(line) for line in text.split('\n')])
+
+
+def generate_html_content(header_image_url, pages, total_pages, footer_static_text, first_page_title, inline_css=True):
+    style = STYLE_TEMPLATE.format(css=report_css(footer_static_text)) if inline_css else ""
+    html_parts = [HTML_HEAD_TEMPLATE.format(style=style), HEADER_TEMPLATE.format(header_image_url=header_image_url)]
+    page_count = 1
+    for index, page in enumerate(pages):
+        page_content = apply_formatting(PAGE_NUMBER_PREFIX_PATTERN.sub('', page, count=1).replace('\n', '<br>'))
+
+        # Skip empty pages
+        if not page_content.strip():
+            continue
+
+        if index == 0:
+            html_parts.append(FIRST_PAGE_TEMPLATE.format(first_page_title=first_page_title,
+                                                         page_content=page_content))
+        else:
+            html_parts.append(PAGE_TEMPLATE.format(page_count=page_count, page_content=page_content))
+        page_count += 1
 
-    return html_head + html_body + html_footer
+    html_parts.append(HTML_FOOTER)
+    return ''.join(html_parts)
 
 
 if __name__ == "__main__":
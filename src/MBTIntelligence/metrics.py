@@ -0,0 +1,144 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Tuple
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_METRICS_LOG = os.path.join(ROOT_DIR, "logs", "metrics.jsonl")
+
+# Report the current task is working on; asyncio tasks inherit it from the task that created them
+current_report: ContextVar[Optional[str]] = ContextVar('current_report', default=None)
+
+# Span attributes that are summed into the Prometheus counters, with their metric name and labels
+COUNTED_ATTRIBUTES = {
+    'prompt_tokens': ('mbti_tokens_total', 'kind="prompt"'),
+    'completion_tokens': ('mbti_tokens_total', 'kind="completion"'),
+    'bytes_read': ('mbti_bytes_total', 'direction="read"'),
+    'bytes_written': ('mbti_bytes_total', 'direction="written"'),
+    'cache_hit': ('mbti_cache_hits_total', None),
+    'checkpoint_hit': ('mbti_checkpoint_hits_total', None),
+    'memory_segments': ('mbti_translation_memory_lines_total', 'result="lookup"'),
+    'memory_hits': ('mbti_translation_memory_lines_total', 'result="hit"'),
+}
+
+
+class Span:
+    """One timed unit of work: a pipeline stage of a report, or a single page or request within it."""
+
+    def __init__(self, name: str, report: Optional[str], page: Optional[int], attributes: Dict[str, object]):
+        self.name = name
+        self.report = report
+        self.page = page
+        self.attributes = attributes
+        self.status = 'ok'
+        self.timestamp = time.time()
+        self.started = time.perf_counter()
+        self.duration = 0.0
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def to_record(self) -> Dict[str, object]:
+        record = {
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.timestamp)),
+            'report': self.report,
+            'span': self.name,
+            'page': self.page,
+            'duration_s': round(self.duration, 6),
+            'status': self.status
+        }
+        record.update(self.attributes)
+        return record
+
+
+class MetricsRecorder:
+    """
+    Collects spans and appends each one as a JSON line to log_path. Durations, token counts,
+    bytes and cache hits are also summed per span name and, when prometheus_path is set,
+    written in the Prometheus text format for the node exporter textfile collector.
+    """
+
+    def __init__(self, log_path: Optional[str] = DEFAULT_METRICS_LOG, prometheus_path: Optional[str] = None):
+        self.log_path = log_path
+        self.prometheus_path = prometheus_path
+        self._totals: Dict[Tuple[str, str, Optional[str]], float] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, page: Optional[int] = None, **attributes) -> Iterator[Span]:
+        """Times the body of the with block; attributes can be added on the yielded span."""
+        span = Span(name, current_report.get(), page, attributes)
+        try:
+            yield span
+        except BaseException:
+            span.status = 'error'
+            raise
+        finally:
+            span.duration = time.perf_counter() - span.started
+            self.record(span)
+
+    def record_duration(self, name: str, duration: float, page: Optional[int] = None, **attributes) -> None:
+        # For work that is not a single block of code, such as a page arriving in a stream
+        span = Span(name, current_report.get(), page, attributes)
+        span.duration = duration
+        self.record(span)
+
+    def record(self, span: Span) -> None:
+        line = json.dumps(span.to_record(), ensure_ascii=False)
+        with self._lock:
+            self._add(('mbti_span_duration_seconds_total', span.name, None), span.duration)
+            self._add(('mbti_spans_total', span.name, f'status="{span.status}"'), 1)
+            for attribute, (metric, labels) in COUNTED_ATTRIBUTES.items():
+                value = span.attributes.get(attribute)
+                if value:
+                    self._add((metric, span.name, labels), float(value))
+            if self.log_path is not None:
+                os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+                with open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.write(line + '\n')
+
+    def _add(self, key: Tuple[str, str, Optional[str]], value: float) -> None:
+        self._totals[key] = self._totals.get(key, 0.0) + value
+
+    def totals(self) -> Dict[Tuple[str, str, Optional[str]], float]:
+        with self._lock:
+            return dict(self._totals)
+
+    def export_prometheus(self) -> None:
+        """Rewrites the Prometheus textfile with the totals so far (no-op without prometheus_path)."""
+        if self.prometheus_path is None:
+            return
+        lines = []
+        current_metric = None
+        for (metric, span_name, labels), value in sorted(self.totals().items(), key=lambda item: item[0][:2]):
+            if metric != current_metric:
+                lines.append(f"# TYPE {metric} counter")
+                current_metric = metric
+            label_text = f'span="{span_name}"' + (f',{labels}' if labels else '')
+            lines.append(f"{metric}{{{label_text}}} {value:g}")
+        os.makedirs(os.path.dirname(os.path.abspath(self.prometheus_path)), exist_ok=True)
+        tmp_path = f"{self.prometheus_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        # The collector must never read a half-written file
+        os.replace(tmp_path, self.prometheus_path)
+
+
+@contextmanager
+def report_context(report_id: str) -> Iterator[None]:
+    """Attributes every span recorded in the with block, including in tasks it starts, to report_id."""
+    token = current_report.set(report_id)
+    try:
+        yield
+    finally:
+        current_report.reset(token)
+
+
+metrics = MetricsRecorder(
+    log_path=None if os.getenv('MBTI_METRICS_DISABLED', '').lower() in ('1', 'true', 'yes')
+    else os.getenv('MBTI_METRICS_LOG', DEFAULT_METRICS_LOG),
+    prometheus_path=os.getenv('MBTI_METRICS_PROMETHEUS') or None
+)
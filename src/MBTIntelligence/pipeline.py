@@ -0,0 +1,367 @@
+import os
+import asyncio
+import logging
+import functools
+from concurrent.futures import Executor
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional
+
+from . import translation
+from .extract_text import extract_cleaned_pages
+from .extract_backends import get_backend
+from .translation import (translate_to_hebrew, stream_translate_to_hebrew, translation_backend, SYSTEM_PROMPT, MODEL,
+                          SAMPLING_PARAMS)
+from .fixed_text import splice_fixed_text
+from .mbti_to_pdf import get_renderer
+from .assets import file_sha256, DEFAULT_FONT_PATH
+from .checkpoints import CheckpointStore, DEFAULT_CHECKPOINT_DIR, DEFAULT_CHECKPOINT_MAX_BYTES, STAGES, pages_sha256
+from .translation_mask import TranslationMask, LineCountMismatchError, mask_config_hash
+from .translation_memory import TranslationMemory, DEFAULT_MEMORY_PATH
+from .translation_cache import TranslationCache
+from .report_document import ReportDocument
+from .utils import Page, split_pages, join_pages, get_all_info, get_formatted_type_qualities
+from .consts import fixed_text_data, lines_to_remove, FIRST_PAGE_TITLE
+from .metrics import metrics, report_context
+from .report_logging import payload_logger
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_OUTPUT_DIR = os.path.join(ROOT_DIR, "output")
+DEFAULT_LOGO_PATH = os.path.join(ROOT_DIR, "media", "full_logo.png")
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+checkpoints = CheckpointStore(
+    checkpoint_dir=os.getenv('MBTI_CHECKPOINT_DIR', DEFAULT_CHECKPOINT_DIR),
+    max_bytes=int(os.getenv('MBTI_CHECKPOINT_MB', DEFAULT_CHECKPOINT_MAX_BYTES // (1024 * 1024))) * 1024 * 1024
+)
+translation_memory = TranslationMemory(
+    db_path=os.getenv('MBTI_TRANSLATION_MEMORY', DEFAULT_MEMORY_PATH),
+    disabled=os.getenv('MBTI_TRANSLATION_MEMORY_DISABLED', '').lower() in ('1', 'true', 'yes')
+)
+
+
+def use_state_dir(state_dir: str) -> None:
+    """
+    Moves the translation cache, the stage checkpoints and the translation memory of this
+    process under state_dir, so that runs with the stub backend leave the real ones untouched.
+    """
+    global checkpoints, translation_memory
+    checkpoints = CheckpointStore(os.path.join(state_dir, "checkpoints"), checkpoints.max_bytes)
+    translation_memory.close()
+    translation_memory = TranslationMemory(os.path.join(state_dir, "translation_memory.sqlite3"),
+                                           translation_memory.disabled)
+    translation.translation_cache = TranslationCache(os.path.join(state_dir, "translations"),
+                                                     translation.translation_cache.max_bytes,
+                                                     translation.translation_cache.bypass)
+
+
+async def translate_pages(pages: List[Page], streaming: bool = True, use_cache: bool = True, by_page: bool = False,
+                          max_output_tokens: Optional[int] = None,
+                          mask: Optional[TranslationMask] = None) -> AsyncIterator[Page]:
+    """
+    Translates extracted pages and yields the translated pages in order. In streaming mode
+    pages are yielded while the rest of the document is still being generated; otherwise
+    they are yielded once translate_to_hebrew returns (see it for by_page and max_output_tokens).
+    With a mask only its unmasked lines are sent (see TranslationMask, which also fills in
+    lines from the translation memory), and pages with nothing left to translate are not sent at all.
+    A page whose translation does not keep the line count is translated again without the mask.
+    """
+    if mask is None:
+        text = join_pages(pages)
+    elif mask.pages_to_translate:
+        text = join_pages(mask.pages_to_translate)
+    else:
+        for page in mask.remaining_pages():
+            yield page
+        return
+
+    if streaming:
+        async for translated_page in stream_translate_to_hebrew(text, use_cache):
+            for page in await _merge_masked(mask, translated_page, use_cache):
+                yield page
+    else:
+        translated_text = await translate_to_hebrew(text, by_page=by_page, use_cache=use_cache,
+                                                    max_output_tokens=max_output_tokens)
+        if translated_text is None:
+            raise ValueError("Translation failed. No Hebrew text was generated.")
+        for translated_page in split_pages(translated_text):
+            for page in await _merge_masked(mask, translated_page, use_cache):
+                yield page
+    if mask is not None:
+        for page in mask.remaining_pages():
+            yield page
+
+
+async def _merge_masked(mask: Optional[TranslationMask], page: Page, use_cache: bool) -> List[Page]:
+    if mask is None:
+        return [page]
+    try:
+        return mask.merge_page(page)
+    except LineCountMismatchError as e:
+        # The masked lines cannot be put back in place, so the whole page is sent as before masking
+        logging.warning(f"[WARNING] {e}; translating the page again without the mask")
+    translated_text = await translate_to_hebrew(join_pages([mask.unmasked_page(page.number)]), by_page=True,
+                                                use_cache=use_cache)
+    if translated_text is None:
+        raise ValueError(f"Translation of page {page.number} failed. No Hebrew text was generated.")
+    translated_page = Page(page.number, dict(split_pages(translated_text)).get(page.number, ""))
+    return mask.merge_page(translated_page, unmasked=True)
+
+
+def insert_fixed_pages(pages: Iterable[Page]) -> List[Page]:
+    """
+    Inserts the fixed text into the translated pages. The name, date and type are read from
+    the whole translated document first, since the fixed text of early pages depends on them.
+    """
+    document = ReportDocument(join_pages(pages))
+    mbti_info = get_all_info(document)
+    logging.info(str(mbti_info))
+    mbti_type_qualities = get_formatted_type_qualities(mbti_info['type'])
+    logging.info(mbti_type_qualities)
+    fixed_text_config = fixed_text_data(mbti_info, mbti_type_qualities)
+    return split_pages(splice_fixed_text(document, fixed_text_config))
+
+
+def render_report(pages: List[Page], output_pdf: str, logo_path: str, first_title: str = FIRST_PAGE_TITLE,
+                  output_html: Optional[str] = None) -> str:
+    """
+    Renders the final pages to a PDF from memory with the renderer of the current process,
+    so a long-lived worker (see create_render_pool) reuses its parsed stylesheet and image cache.
+    The HTML is only written to output_html when a path is given.
+    """
+    return get_renderer().render_pages(pages, output_pdf, logo_path, first_title, output_html)
+
+
+async def _iterate_pages(pages: List[Page]) -> AsyncIterator[Page]:
+    for page in pages:
+        yield page
+
+
+def checkpoint_config(stage: str, streaming: bool = True, by_page: bool = False,
+                      max_output_tokens: Optional[int] = None, logo_path: str = DEFAULT_LOGO_PATH,
+                      mask_translation: bool = True, use_memory: bool = True) -> Dict[str, object]:
+    """The settings that affect the output of a stage, hashed into its checkpoint key."""
+    if stage == 'extract':
+        # Backends that pass check_conformance agree on the lines, not on spacing within them
+        return {'lines_to_remove': lines_to_remove, 'backend': get_backend().name}
+    if stage == 'translate':
+        # Streaming sends the same single request as a whole-document translation
+        return {'system_prompt': SYSTEM_PROMPT, 'model': MODEL, 'params': SAMPLING_PARAMS,
+                'backend': translation_backend(), 'by_page': by_page and not streaming,
+                'max_output_tokens': None if streaming else max_output_tokens,
+                'mask': mask_config_hash() if mask_translation else None,
+                'memory': use_memory and not translation_memory.disabled}
+    if stage == 'fixed_text':
+        # The fixed text and type qualities are code in consts.py rather than data
+        return {'consts': file_sha256(os.path.join(PACKAGE_DIR, "consts.py")),
+                'fixed_text': file_sha256(os.path.join(PACKAGE_DIR, "fixed_text.py"))}
+    if stage == 'render':
+        return {'templates': file_sha256(os.path.join(PACKAGE_DIR, "mbti_to_pdf.py")),
+                'logo': file_sha256(logo_path), 'font': file_sha256(DEFAULT_FONT_PATH),
+                'first_title': FIRST_PAGE_TITLE}
+    raise ValueError(f"Unknown pipeline stage: {stage}")
+
+
+def _write_pages(path: str, pages: Iterable[Page]) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(join_pages(pages))
+
+
+async def run_pipeline(pdf_path: str, output_dir: str = DEFAULT_OUTPUT_DIR, logo_path: str = DEFAULT_LOGO_PATH,
+                       keep_intermediates: bool = False, streaming: bool = True, use_cache: bool = True,
+                       by_page: bool = False, max_output_tokens: Optional[int] = None,
+                       executor: Optional[Executor] = None, translation_slots: Optional[asyncio.Semaphore] = None,
+                       on_page: Optional[Callable[[Page], None]] = None,
+                       on_stage: Optional[Callable[[str, int], None]] = None, use_checkpoints: bool = True,
+                       force_stages: Iterable[str] = (), mask_translation: bool = True,
+                       use_memory: bool = True, report_name: Optional[str] = None) -> str:
+    """
+    Runs extract -> translate -> insert fixed text -> HTML -> PDF for one report, passing the
+    pages between the stages in memory.
+
+    Args:
+        pdf_path: The MBTI Step II PDF report
+        output_dir: Directory for the final PDF (and the intermediate files, if kept)
+        logo_path: Logo used in the generated report header
+        keep_intermediates: Also write _cleaned.txt, _hebrew.txt, _fixed.txt and _report.html for debugging
+        streaming: Stream the translation page by page (see translate_pages for the other options)
+        executor: Executor for the CPU-bound extraction and rendering stages (defaults to the loop's thread pool)
+        translation_slots: Semaphore shared by reports to bound how many are translated at once
+        on_page: Called with every translated page as soon as it is available
+        on_stage: Called with the name of every stage (extract, translate, fixed_text, render) as it
+            starts, and the number of pages extracted so far
+        use_checkpoints: Resume from the stored output of the stages already completed for this input
+            and configuration, and store the output of the stages that run (see CheckpointStore)
+        force_stages: Stages to rerun even if they have a checkpoint; the stages after them are
+            rerun too if the forced stage's output changes
+        mask_translation: Only send the lines that need translating (see TranslationMask)
+        use_memory: Fill in the lines already in the translation memory instead of sending them,
+            and add the newly translated lines to it (see TranslationMemory)
+        report_name: Name of the output files and of the report in the logs and metrics, defaults to
+            the PDF's file name (the input store keeps PDFs under their hash, see InputStore)
+
+    Returns:
+        The path of the generated PDF report.
+    """
+    unknown_stages = set(force_stages) - set(STAGES)
+    if unknown_stages:
+        raise ValueError(f"Unknown pipeline stages: {', '.join(sorted(unknown_stages))}")
+    base_name = report_name or os.path.splitext(os.path.basename(pdf_path))[0]
+    # Every span recorded while this report is processed, in this task or the ones it starts, carries its name
+    with report_context(base_name):
+        try:
+            with metrics.span('report') as report_span:
+                output_pdf = await _run_stages(pdf_path, base_name, output_dir, logo_path, keep_intermediates,
+                                               streaming, use_cache, by_page, max_output_tokens, executor,
+                                               translation_slots, on_page, on_stage,
+                                               checkpoints if use_checkpoints else None, set(force_stages),
+                                               mask_translation, use_memory)
+                report_span.set(bytes_written=os.path.getsize(output_pdf))
+            return output_pdf
+        finally:
+            metrics.export_prometheus()
+
+
+async def _run_stages(pdf_path, base_name, output_dir, logo_path, keep_intermediates, streaming, use_cache, by_page,
+                      max_output_tokens, executor, translation_slots, on_page, on_stage, store, force_stages,
+                      mask_translation, use_memory):
+    loop = asyncio.get_running_loop()
+
+    def stage_started(stage, page_count=0):
+        if on_stage is not None:
+            on_stage(stage, page_count)
+
+    def stage_key(stage, input_hash):
+        return CheckpointStore.make_key(stage, input_hash, checkpoint_config(stage, streaming, by_page,
+                                                                             max_output_tokens, logo_path,
+                                                                             mask_translation, use_memory))
+
+    # Checkpoint reads and writes are file I/O (and an occasional scan of the whole store when
+    # it is full), so they run in the default thread pool like the translation memory queries
+    async def load_checkpoint(stage, key):
+        if store is None or stage in force_stages:
+            return None
+        if stage == 'translate' and not use_cache:
+            # Without the cache a new translation is requested, so the stored one is not reused either
+            return None
+        pages = await loop.run_in_executor(None, store.load_pages, stage, key)
+        if pages is not None:
+            logging.info(f"[INFO] Reusing the {stage} checkpoint")
+        return pages
+
+    os.makedirs(output_dir, exist_ok=True)
+    if not os.path.exists(logo_path):
+        raise FileNotFoundError(f"Logo file not found at {logo_path}")
+
+    def artifact_path(suffix):
+        return os.path.join(output_dir, base_name + suffix)
+
+    # Step 1: Extract Text
+    logging.info("[PROCESS] Step 1: Extracting text from PDF...")
+    stage_started('extract')
+    with metrics.span('extract', bytes_read=os.path.getsize(pdf_path)) as span:
+        extract_key = stage_key('extract', await loop.run_in_executor(executor, file_sha256, pdf_path))
+        pages = await load_checkpoint('extract', extract_key)
+        span.set(checkpoint_hit=pages is not None)
+        if pages is None:
+            pages = await loop.run_in_executor(executor, extract_cleaned_pages, pdf_path, lines_to_remove)
+            if pages and store is not None:
+                await loop.run_in_executor(None, store.save_pages, 'extract', extract_key, pages)
+        span.set(pages=len(pages), chars_out=sum(len(page.text) for page in pages))
+    if not pages:
+        raise ValueError(f"PDF processing failed. No text was extracted from {pdf_path}")
+    if payload_logger.isEnabledFor(logging.DEBUG):
+        payload_logger.debug(join_pages(pages))
+    if keep_intermediates:
+        _write_pages(artifact_path("_cleaned.txt"), pages)
+    logging.info(f"[INFO] Text extracted successfully: {len(pages)} pages")
+
+    # Step 2: Translate to Hebrew
+    logging.info("[PROCESS] Step 2: Translating text to Hebrew...")
+    stage_started('translate', len(pages))
+    translated_pages = []
+    mask = None
+    translate_key = stage_key('translate', pages_sha256(pages))
+    checkpoint_pages = await load_checkpoint('translate', translate_key)
+    hebrew_file = open(artifact_path("_hebrew.txt"), 'w', encoding='utf-8') if keep_intermediates else None
+    if translation_slots is not None and checkpoint_pages is None:
+        await translation_slots.acquire()
+    try:
+        with metrics.span('translate', streaming=streaming, checkpoint_hit=checkpoint_pages is not None) as span:
+            if checkpoint_pages is not None:
+                page_source = _iterate_pages(checkpoint_pages)
+            else:
+                memory = translation_memory if use_memory and not translation_memory.disabled else None
+                if mask_translation or memory is not None:
+                    memory_context = TranslationMemory.make_context(SYSTEM_PROMPT, MODEL, SAMPLING_PARAMS,
+                                                                    translation_backend())
+                    # The memory lookup is SQLite I/O, so the mask is built in a thread; the executor
+                    # may be a process pool, which cannot share the memory's connection
+                    mask = await loop.run_in_executor(
+                        None, functools.partial(TranslationMask, pages, mask_lines=mask_translation, memory=memory,
+                                                memory_context=memory_context))
+                    span.set(**mask.stats())
+                    if memory is not None:
+                        logging.info(f"[INFO] Translation memory: {mask.memory_hits} of {mask.memory_segments} "
+                                     f"lines reused ({mask.memory_hits / max(mask.memory_segments, 1):.0%})")
+                page_source = translate_pages(pages, streaming, use_cache, by_page, max_output_tokens, mask)
+            async for page in page_source:
+                translated_pages.append(page)
+                if hebrew_file is not None:
+                    hebrew_file.write(join_pages([page]))
+                    hebrew_file.flush()
+                if on_page is not None:
+                    on_page(page)
+            span.set(pages=len(translated_pages), chars_out=sum(len(page.text) for page in translated_pages))
+            if mask is not None:
+                await loop.run_in_executor(None, mask.save_to_memory)
+    finally:
+        if translation_slots is not None and checkpoint_pages is None:
+            translation_slots.release()
+        if hebrew_file is not None:
+            hebrew_file.close()
+    if translated_pages and checkpoint_pages is None and store is not None:
+        # Only a complete translation is stored, a failed run translates again from the start
+        await loop.run_in_executor(None, store.save_pages, 'translate', translate_key, translated_pages)
+    if not translated_pages:
+        raise ValueError("Translation failed. No Hebrew text was generated.")
+    if payload_logger.isEnabledFor(logging.DEBUG):
+        payload_logger.debug("translated text:\n" + join_pages(translated_pages))
+    logging.info(f"[INFO] Translation completed: {len(translated_pages)} pages")
+
+    # Step 3: Insert Fixed Text
+    logging.info("[PROCESS] Step 3: Inserting fixed text...")
+    stage_started('fixed_text', len(pages))
+    with metrics.span('fixed_text') as span:
+        fixed_key = stage_key('fixed_text', pages_sha256(translated_pages))
+        fixed_pages = await load_checkpoint('fixed_text', fixed_key)
+        span.set(checkpoint_hit=fixed_pages is not None)
+        if fixed_pages is None:
+            fixed_pages = insert_fixed_pages(translated_pages)
+            if store is not None:
+                await loop.run_in_executor(None, store.save_pages, 'fixed_text', fixed_key, fixed_pages)
+        span.set(pages=len(fixed_pages), chars_out=sum(len(page.text) for page in fixed_pages))
+    if keep_intermediates:
+        _write_pages(artifact_path("_fixed.txt"), fixed_pages)
+    logging.info("[INFO] Fixed text inserted")
+
+    # Step 4: Generate PDF
+    logging.info("[PROCESS] Step 4: Generating final PDF report...")
+    stage_started('render', len(pages))
+    output_pdf = artifact_path("_report.pdf")
+    output_html = artifact_path("_report.html") if keep_intermediates else None
+    with metrics.span('render', pages=len(fixed_pages)) as span:
+        render_key = stage_key('render', pages_sha256(fixed_pages))
+        # The HTML is not stored, so a run that keeps it renders again
+        reuse_render = store is not None and 'render' not in force_stages and output_html is None
+        if reuse_render and await loop.run_in_executor(None, store.load_file, 'render', render_key, output_pdf):
+            logging.info("[INFO] Reusing the render checkpoint")
+            span.set(checkpoint_hit=True)
+        else:
+            await loop.run_in_executor(executor, render_report, fixed_pages, output_pdf, logo_path,
+                                       FIRST_PAGE_TITLE, output_html)
+            if store is not None and os.path.exists(output_pdf):
+                await loop.run_in_executor(None, store.save_file, 'render', render_key, output_pdf)
+        if not os.path.exists(output_pdf):
+            raise FileNotFoundError(f"Final PDF was not generated at {output_pdf}")
+        span.set(bytes_written=os.path.getsize(output_pdf))
+    logging.info(f"[SUCCESS] PDF report generated successfully: {output_pdf}")
+    return output_pdf
@@ -0,0 +1,172 @@
+import time
+import random
+import asyncio
+import threading
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+import openai
+
+T = TypeVar('T')
+
+# Errors worth retrying: rate limits, timeouts, dropped connections and server side failures
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at rate_per_minute, holding at most one minute of budget.
+
+    reserve() always takes the tokens immediately and may drive the bucket negative; the
+    returned delay is how long the caller has to wait until its reservation is covered.
+    Callers therefore get their turn in arrival order without holding a lock while waiting.
+    """
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        self._refill(now)
+        self.tokens -= min(amount, self.capacity)
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def adjust(self, amount: float, now: float) -> None:
+        # Corrects an earlier reservation once the real cost is known (negative amounts give tokens back)
+        self._refill(now)
+        self.tokens -= amount
+
+
+class RequestScheduler:
+    """
+    Keeps API calls under a requests-per-minute and tokens-per-minute budget and retries
+    failed calls with jittered exponential backoff, honoring the Retry-After header of 429 responses.
+    A rate limit response pauses every queued request, not only the one that received it.
+    """
+
+    def __init__(self, requests_per_minute: float = 500, tokens_per_minute: float = 200000,
+                 max_retries: int = 6, base_delay: float = 1.0, max_delay: float = 60.0):
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+        self.queue_depth = 0
+        self.in_flight = 0
+        self.requests = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def acquire(self, estimated_tokens: int) -> float:
+        """Waits until the request fits the budget and returns the time spent waiting."""
+        with self._lock:
+            now = time.monotonic()
+            delay = max(self.request_bucket.reserve(1, now),
+                        self.token_bucket.reserve(estimated_tokens, now),
+                        self.blocked_until - now)
+            self.queue_depth += 1
+        waited = 0.0
+        try:
+            while delay > 0:
+                await asyncio.sleep(delay)
+                waited += delay
+                # A rate limit response received while this request was waiting pauses it as well
+                with self._lock:
+                    delay = self.blocked_until - time.monotonic()
+        finally:
+            with self._lock:
+                self.queue_depth -= 1
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+        return waited
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int) -> None:
+        with self._lock:
+            self.token_bucket.adjust(actual_tokens - estimated_tokens, time.monotonic())
+
+    def _backoff_delay(self, error: Exception, attempt: int) -> float:
+        retry_after = _retry_after_seconds(error)
+        if retry_after is not None:
+            return retry_after + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def run(self, request: Callable[[], Awaitable[T]], estimated_tokens: int) -> T:
+        """
+        Runs request() once the budget allows it, retrying retryable errors up to max_retries times.
+
+        Args:
+            request: Coroutine function performing the API call
+            estimated_tokens: Tokens the call is expected to use (prompt plus completion)
+        """
+        attempt = 0
+        while True:
+            await self.acquire(estimated_tokens)
+            with self._lock:
+                self.requests += 1
+                self.in_flight += 1
+            try:
+                return await request()
+            except RETRYABLE_ERRORS as e:
+                with self._lock:
+                    # The failed attempt produced no completion; its retry reserves the tokens again
+                    self.token_bucket.adjust(-estimated_tokens, time.monotonic())
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff_delay(e, attempt)
+                with self._lock:
+                    self.retries += 1
+                    if isinstance(e, openai.RateLimitError):
+                        self.rate_limited += 1
+                        self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+                print(f"{type(e).__name__}, retrying in {delay:.1f} seconds (attempt {attempt + 1} of "
+                      f"{self.max_retries})")
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            waits = self.requests or 1
+            return {
+                'queue_depth': self.queue_depth,
+                'in_flight': self.in_flight,
+                'requests': self.requests,
+                'retries': self.retries,
+                'rate_limited': self.rate_limited,
+                'total_wait': self.total_wait,
+                'mean_wait': self.total_wait / waits,
+                'max_wait': self.max_wait
+            }
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if 'retry-after-ms' in headers:
+            return float(headers['retry-after-ms']) / 1000.0
+        if 'retry-after' in headers:
+            return float(headers['retry-after'])
+    except ValueError:
+        # Retry-After may also be an HTTP date; fall back to exponential backoff
+        return None
+    return None
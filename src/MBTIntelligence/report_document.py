@@ -0,0 +1,125 @@
+import re
+from functools import cached_property
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from .consts import MBTI_TYPES, MBTI_QUALITIES
+except ImportError:
+    from consts import MBTI_TYPES, MBTI_QUALITIES
+
+# Hebrew date pattern: day month year
+HEBREW_DATE_PATTERN = re.compile(r'\d{1,2}\s+ב?[א-ת]+\s+\d{4}')
+# Line with מוחצנות or מופנמות followed by the four preference scores
+SCORES_PATTERN = re.compile(r'(מוחצנות|מופנמות).*?(\d+).*?(\d+).*?(\d+).*?(\d+)', re.DOTALL)
+# Every occurrence of a type code, including overlapping ones
+MBTI_TYPE_PATTERN = re.compile('(?=(' + '|'.join(MBTI_TYPES) + '))')
+SCORED_QUALITIES = ['Extraversion', 'Sensing', 'Thinking', 'Judging']
+
+
+def parse_page_delimiter(line: str) -> Optional[int]:
+    """
+    Returns the page number of a "--- Page N ---" delimiter line, -1 for a delimiter
+    without a valid number, or None if the line is not a delimiter.
+    """
+    stripped = line.strip()
+    if not (stripped.startswith('--- Page ') and stripped.endswith('---')):
+        return None
+    try:
+        return int(stripped.replace('--- Page ', '').replace(' ---', ''))
+    except ValueError:
+        return -1
+
+
+class ReportDocument:
+    """
+    Page-structured report text that is read and indexed once.
+
+    Lines are numbered per page the same way insert_fixed_text numbers them: the first
+    line after a "--- Page N ---" delimiter is line 1. Lines before the first delimiter
+    belong to page 0. The name, date, type and score queries give the same answers as the
+    file based helpers in utils, without reading the file again.
+    """
+
+    def __init__(self, text: str, source_path: Optional[str] = None):
+        self.text = text
+        self.source_path = source_path
+        self.pages: List[Tuple[int, List[str]]] = []
+        self._page_index: Dict[int, List[str]] = {}
+        self._index_pages()
+
+    @classmethod
+    def from_file(cls, file_path: str, encoding: str = 'utf-8') -> 'ReportDocument':
+        with open(file_path, 'r', encoding=encoding) as f:
+            return cls(f.read(), file_path)
+
+    def _index_pages(self) -> None:
+        current_lines = []
+        self.pages.append((0, current_lines))
+        lines = self.text.split('\n')
+        if lines and lines[-1] == '':
+            lines.pop()
+        for line in lines:
+            page_num = parse_page_delimiter(line)
+            if page_num is None:
+                current_lines.append(line)
+                continue
+            if page_num < 0:
+                # Delimiters without a valid number are not counted as lines (see insert_fixed_text)
+                continue
+            current_lines = []
+            self.pages.append((page_num, current_lines))
+        if not self.pages[0][1]:
+            self.pages.pop(0)
+        for page_num, lines in self.pages:
+            # Duplicate page numbers resolve to the first page carrying that number
+            self._page_index.setdefault(page_num, lines)
+
+    @property
+    def page_numbers(self) -> List[int]:
+        return [page_num for page_num, _ in self.pages]
+
+    def page(self, page_num: int) -> List[str]:
+        return self._page_index.get(page_num, [])
+
+    def page_text(self, page_num: int) -> str:
+        return '\n'.join(self.page(page_num))
+
+    def line(self, page_num: int, line_num: int) -> Optional[str]:
+        lines = self.page(page_num)
+        if 1 <= line_num <= len(lines):
+            return lines[line_num - 1]
+        return None
+
+    @cached_property
+    def name(self) -> Optional[str]:
+        # The name is the second line of the file, right after the first page delimiter
+        lines = self.text.split('\n', 2)
+        second_line = lines[1].strip() if len(lines) > 1 else ''
+        return second_line if second_line else None
+
+    @cached_property
+    def date(self) -> Optional[str]:
+        date_match = HEBREW_DATE_PATTERN.search(self.text)
+        return date_match.group() if date_match else None
+
+    @cached_property
+    def type(self) -> Optional[str]:
+        found = set(MBTI_TYPE_PATTERN.findall(self.text))
+        # MBTI_TYPES order decides when several codes appear in the text
+        return next((mbti_type for mbti_type in MBTI_TYPES if mbti_type in found), None)
+
+    def info(self) -> Dict[str, Optional[str]]:
+        return {
+            'name': self.name,
+            'date': self.date,
+            'type': self.type
+        }
+
+    def qualities_scores(self) -> Dict[str, int]:
+        qualities_scores = {quality: 0 for quality in MBTI_QUALITIES}
+        if self.type:
+            match = SCORES_PATTERN.search(self.text)
+            if match:
+                for i, quality in enumerate(SCORED_QUALITIES):
+                    qualities_scores[quality] = int(match.group(i + 2))
+        return qualities_scores
@@ -0,0 +1,133 @@
+import os
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List, Optional
+
+from .metrics import current_report
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_LOG_DIR = os.path.join(ROOT_DIR, "logs")
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+# Seconds to wait for the listener to write out a report log before it is closed anyway
+CLOSE_TIMEOUT = 10.0
+
+# Whole documents (extracted, translated and fixed text) are logged here at DEBUG level,
+# which is only enabled with setup_logging(log_payloads=True) or MBTI_LOG_PAYLOADS=1
+payload_logger = logging.getLogger("MBTIntelligence.payload")
+
+_queue: "queue.Queue[logging.LogRecord]" = queue.Queue()
+_listener: Optional[QueueListener] = None
+_router: Optional["ReportLogRouter"] = None
+_setup_lock = threading.Lock()
+
+
+class ReportContextFilter(logging.Filter):
+    """Stamps records with the report being processed, while still on the thread that logged them."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, 'report_id', None) is None:
+            record.report_id = current_report.get()
+        return True
+
+
+class ReportLogRouter(logging.Handler):
+    """
+    The single handler behind the queue listener. Every record goes to the shared handlers
+    (such as the GUI console) and, when its report has an open log file, to that file.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.shared_handlers: List[logging.Handler] = []
+        self.report_handlers: Dict[str, logging.FileHandler] = {}
+        self._handlers_lock = threading.Lock()
+
+    def open(self, report_id: str, log_path: str) -> None:
+        handler = logging.FileHandler(log_path, encoding='utf-8')
+        handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT))
+        with self._handlers_lock:
+            self.report_handlers[report_id] = handler
+
+    def emit(self, record: logging.LogRecord) -> None:
+        report_id = getattr(record, 'report_id', None)
+        close_event = getattr(record, 'close_event', None)
+        if close_event is not None:
+            # Queued behind every record of the report, so nothing is lost when the file is closed
+            with self._handlers_lock:
+                handler = self.report_handlers.pop(report_id, None)
+            if handler is not None:
+                handler.close()
+            close_event.set()
+            return
+
+        for handler in self.shared_handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+        with self._handlers_lock:
+            handler = self.report_handlers.get(report_id)
+        if handler is not None:
+            handler.handle(record)
+
+
+def setup_logging(level: int = logging.INFO, log_payloads: Optional[bool] = None) -> ReportLogRouter:
+    """
+    Configures logging once per process: the root logger only puts records on a queue, and a
+    listener thread does the formatting and file I/O. Calling it again returns the same router.
+
+    Args:
+        level: Level of the root logger
+        log_payloads: Log whole documents through payload_logger (defaults to MBTI_LOG_PAYLOADS)
+    """
+    global _listener, _router
+    with _setup_lock:
+        if _router is not None:
+            return _router
+        if log_payloads is None:
+            log_payloads = os.getenv('MBTI_LOG_PAYLOADS', '').lower() in ('1', 'true', 'yes')
+        payload_logger.setLevel(logging.DEBUG if log_payloads else logging.INFO)
+
+        queue_handler = QueueHandler(_queue)
+        queue_handler.addFilter(ReportContextFilter())
+        root_logger = logging.getLogger()
+        root_logger.setLevel(level)
+        root_logger.addHandler(queue_handler)
+
+        _router = ReportLogRouter()
+        _listener = QueueListener(_queue, _router)
+        _listener.start()
+        atexit.register(_listener.stop)
+        return _router
+
+
+def add_log_handler(handler: logging.Handler) -> None:
+    """Adds a handler that receives the records of every report, such as the GUI console."""
+    setup_logging().shared_handlers.append(handler)
+
+
+def open_report_log(report_id: str, log_dir: str = DEFAULT_LOG_DIR) -> str:
+    """
+    Starts writing the records logged under report_context(report_id) to their own file.
+
+    Returns:
+        The path of the log file.
+    """
+    router = setup_logging()
+    os.makedirs(log_dir, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    log_path = os.path.join(log_dir, f"{report_id}-{timestamp}-log.txt")
+    router.open(report_id, log_path)
+    return log_path
+
+
+def close_report_log(report_id: str) -> None:
+    """Waits until the records of report_id already logged are written, then closes its file."""
+    if _router is None:
+        return
+    close_event = threading.Event()
+    _queue.put(logging.makeLogRecord({'report_id': report_id, 'close_event': close_event}))
+    close_event.wait(CLOSE_TIMEOUT)
@@ -0,0 +1,291 @@
+import os
+import re
+import json
+import time
+import uuid
+import asyncio
+import argparse
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs
+from concurrent.futures import Executor
+from typing import Dict, Optional, Tuple
+
+from .pipeline import run_pipeline, use_state_dir, ROOT_DIR, DEFAULT_LOGO_PATH
+from .mbti_to_pdf import create_render_pool
+from .input_store import InputStore
+
+DEFAULT_JOBS_DIR = os.path.join(ROOT_DIR, "service_jobs")
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+# Jobs waiting for a worker; uploads beyond this are refused with 503 until the queue drains
+MAX_QUEUED_JOBS = 100
+JOB_PATH_PATTERN = re.compile(r'^/jobs/([0-9a-f]{32})(/report)?$')
+SAFE_NAME_PATTERN = re.compile(r'[^\w.-]+')
+
+
+class HTTPError(Exception):
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class ServiceJob:
+    """A report uploaded to the service and its progress through the pipeline."""
+
+    def __init__(self, job_id: str, file_name: str, pdf_path: str, name: str, digest: str):
+        self.id = job_id
+        self.file_name = file_name
+        self.pdf_path = pdf_path
+        self.name = name
+        self.digest = digest
+        self.reused = False
+        self.status = "queued"
+        self.stage = None
+        self.page_count = 0
+        self.pages_translated = 0
+        self.output_pdf = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            'id': self.id,
+            'file': self.file_name,
+            'status': self.status,
+            'stage': self.stage,
+            'pages': self.page_count,
+            'pages_translated': self.pages_translated,
+            'error': self.error,
+            'sha256': self.digest,
+            'reused': self.reused,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+            'report_url': f"/jobs/{self.id}/report" if self.status == "done" else None
+        }
+
+
+class ReportService:
+    """
+    Accepts PDF uploads over HTTP and runs them through the pipeline on a fixed number of worker
+    tasks. All jobs share the event loop, so they share the translation client and its rate
+    limits, and the render pool, whose worker processes keep their renderer between reports.
+
+    Uploads are kept in an InputStore. A PDF identical to one that is queued or running is
+    answered with that job, and one that was already processed with a finished job for its report.
+
+    Endpoints:
+        POST /jobs              Upload a PDF (the request body, name in ?name=); returns the job id
+        GET  /jobs/<id>         Job status
+        GET  /jobs/<id>/report  The finished _report.pdf
+    """
+
+    def __init__(self, pool: Executor, jobs_dir: str = DEFAULT_JOBS_DIR, workers: int = 2,
+                 logo_path: str = DEFAULT_LOGO_PATH, use_cache: bool = True, max_queued: int = MAX_QUEUED_JOBS,
+                 input_store: Optional[InputStore] = None):
+        self.pool = pool
+        self.jobs_dir = jobs_dir
+        self.input_store = input_store or InputStore(os.path.join(jobs_dir, "inputs"))
+        self.workers = workers
+        self.logo_path = logo_path
+        self.use_cache = use_cache
+        self.jobs: Dict[str, ServiceJob] = {}
+        # The latest job for every uploaded PDF, by content hash
+        self.jobs_by_digest: Dict[str, ServiceJob] = {}
+        self.pending: "asyncio.Queue[ServiceJob]" = asyncio.Queue(max_queued)
+        self._worker_tasks = []
+
+    def start_workers(self) -> None:
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop_workers(self) -> None:
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self.pending.get()
+            try:
+                await self.process_job(job)
+            finally:
+                self.pending.task_done()
+
+    async def process_job(self, job: ServiceJob) -> None:
+        job.status = "running"
+        job.started = time.time()
+
+        def stage_started(stage, page_count):
+            job.stage = stage
+            job.page_count = page_count
+
+        def page_translated(page):
+            job.pages_translated += 1
+
+        try:
+            job.output_pdf = await run_pipeline(job.pdf_path, os.path.join(self.jobs_dir, job.id), self.logo_path,
+                                                use_cache=self.use_cache, executor=self.pool,
+                                                on_page=page_translated, on_stage=stage_started,
+                                                report_name=job.name)
+            await asyncio.get_running_loop().run_in_executor(None, self.input_store.record_report, job.digest,
+                                                             job.output_pdf)
+            job.status = "done"
+            print(f"[SUCCESS] {job.id} {job.file_name} ({time.time() - job.started:.1f}s)")
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            print(f"[FAILED] {job.id} {job.file_name}: {e}")
+        finally:
+            job.stage = None
+            job.finished = time.time()
+
+    async def submit(self, pdf_data: bytes, file_name: str) -> ServiceJob:
+        if not pdf_data.startswith(b'%PDF'):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "The request body is not a PDF file")
+        stored = await asyncio.get_running_loop().run_in_executor(None, self.input_store.add_bytes, pdf_data,
+                                                                  file_name)
+        existing = self.jobs_by_digest.get(stored.digest)
+        if existing is not None and existing.status in ("queued", "running"):
+            return existing
+
+        job = ServiceJob(uuid.uuid4().hex, file_name, stored.path, stored.name, stored.digest)
+        if stored.processed:
+            job.status = "done"
+            job.reused = True
+            job.output_pdf = stored.report
+            job.finished = job.created
+        elif self.pending.full():
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "Too many queued jobs, try again later")
+        else:
+            self.pending.put_nowait(job)
+        self.jobs[job.id] = job
+        self.jobs_by_digest[stored.digest] = job
+        return job
+
+    def get_job(self, job_id: str) -> ServiceJob:
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"Unknown job {job_id}")
+        return job
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            try:
+                status, content_type, body = await self.handle_request(reader)
+            except HTTPError as e:
+                status, content_type, body = e.status, "application/json", _json_body({'error': e.message})
+            except (asyncio.IncompleteReadError, ValueError):
+                status, content_type, body = HTTPStatus.BAD_REQUEST, "application/json", \
+                    _json_body({'error': "Malformed request"})
+            writer.write(f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                         f"Content-Type: {content_type}\r\n"
+                         f"Content-Length: {len(body)}\r\n"
+                         f"Connection: close\r\n\r\n".encode('latin-1') + body)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle_request(self, reader: asyncio.StreamReader) -> Tuple[HTTPStatus, str, bytes]:
+        request_line = (await reader.readline()).decode('latin-1').strip()
+        method, target, _ = request_line.split(' ', 2)
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        url = urlsplit(target)
+        if url.path == '/jobs':
+            if method != 'POST':
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "Use POST to upload a report")
+            content_length = int(headers.get('content-length', 0))
+            if content_length > MAX_UPLOAD_BYTES:
+                raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                                f"Uploads are limited to {MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+            pdf_data = await reader.readexactly(content_length)
+            file_name = safe_file_name(parse_qs(url.query).get('name', [None])[0] or headers.get('x-filename'))
+            job = await self.submit(pdf_data, file_name)
+            status = HTTPStatus.OK if job.status == "done" else HTTPStatus.ACCEPTED
+            return status, "application/json", _json_body(job.to_dict())
+
+        match = JOB_PATH_PATTERN.match(url.path)
+        if match is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"No such endpoint: {url.path}")
+        if method != 'GET':
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "Use GET for job status and reports")
+        job = self.get_job(match.group(1))
+        if match.group(2) is None:
+            return HTTPStatus.OK, "application/json", _json_body(job.to_dict())
+        if job.status != "done":
+            raise HTTPError(HTTPStatus.CONFLICT, f"Job {job.id} is {job.status}, the report is not ready")
+        report = await asyncio.get_running_loop().run_in_executor(None, _read_file, job.output_pdf)
+        return HTTPStatus.OK, "application/pdf", report
+
+
+def safe_file_name(name: Optional[str]) -> str:
+    """The base name of an uploaded file, limited to characters that are safe in a path."""
+    base_name = SAFE_NAME_PATTERN.sub('_', os.path.splitext(os.path.basename(name or ''))[0]).strip('._')
+    return (base_name or "report") + ".pdf"
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _json_body(data: Dict[str, object]) -> bytes:
+    return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+
+async def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, workers: int = 2,
+                render_workers: Optional[int] = None, jobs_dir: str = DEFAULT_JOBS_DIR,
+                use_cache: bool = True) -> None:
+    """Runs the report service until cancelled."""
+    if not os.path.exists(DEFAULT_LOGO_PATH):
+        raise FileNotFoundError(f"Logo file not found at {DEFAULT_LOGO_PATH}")
+    with create_render_pool(render_workers) as pool:
+        service = ReportService(pool, jobs_dir, workers, use_cache=use_cache)
+        service.start_workers()
+        server = await asyncio.start_server(service.handle_connection, host, port)
+        print(f"Serving MBTI reports on http://{host}:{port} with {workers} workers (jobs in {jobs_dir})")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await service.stop_workers()
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to listen on")
+    parser.add_argument("-w", "--workers", type=int, default=2, help="Number of reports processed at once")
+    parser.add_argument("--render-workers", type=int, default=None,
+                        help="Number of worker processes for extraction and rendering")
+    parser.add_argument("--jobs-dir", default=DEFAULT_JOBS_DIR, help="Directory for uploads and reports")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore cached translations and request new ones")
+    parser.add_argument("--stub", action="store_true",
+                        help="Translate with the offline stub instead of OpenAI, for testing; everything it "
+                             "stores is kept under <jobs-dir>/stub")
+
+
+def run(args: argparse.Namespace) -> int:
+    if args.stub:
+        # Read when the translation client is created, on the first request
+        os.environ['MBTI_TRANSLATION_BACKEND'] = 'stub'
+        # Stub uploads, reports, translations and checkpoints are kept apart from the real ones
+        args.jobs_dir = os.path.join(args.jobs_dir, "stub")
+        use_state_dir(os.path.join(args.jobs_dir, "cache"))
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.render_workers, args.jobs_dir,
+                          use_cache=not args.no_cache))
+    except KeyboardInterrupt:
+        pass
+    return 0
@@ -0,0 +1,74 @@
+import time
+import asyncio
+from types import SimpleNamespace
+from typing import AsyncIterator, Dict, List, Optional
+
+try:
+    from .utils import PAGE_MARKER_PATTERN
+    from .token_planner import estimate_input_tokens, CHARS_PER_TOKEN
+except ImportError:
+    from utils import PAGE_MARKER_PATTERN
+    from token_planner import estimate_input_tokens, CHARS_PER_TOKEN
+
+# Lowercase Latin letters become Hebrew letters; upper case (type codes), digits and markup are kept
+_HEBREW_LETTERS = "אבגדהוזחטיכלמנסעפצקרשתאבגד"
+STUB_TRANSLATION_TABLE = str.maketrans("abcdefghijklmnopqrstuvwxyz", _HEBREW_LETTERS)
+
+
+def stub_translate(text: str) -> str:
+    """Deterministic stand-in for a translation that keeps the page delimiters and the text length."""
+    return '\n'.join(line if PAGE_MARKER_PATTERN.match(line) else line.translate(STUB_TRANSLATION_TABLE)
+                     for line in text.split('\n'))
+
+
+class StubCompletions:
+    """
+    Offline replacement for client.chat.completions. Responses take latency seconds to
+    start and then arrive at tokens_per_second, streamed in chunks of chunk_chars characters.
+    """
+
+    def __init__(self, latency: float = 0.5, tokens_per_second: float = 2000.0, chunk_chars: int = 64):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.chunk_chars = chunk_chars
+        self.requests = 0
+
+    def _usage(self, messages: List[Dict[str, str]], content: str) -> SimpleNamespace:
+        prompt_tokens = sum(estimate_input_tokens(message['content']) for message in messages)
+        completion_tokens = int(len(content) / CHARS_PER_TOKEN)
+        return SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                               total_tokens=prompt_tokens + completion_tokens)
+
+    async def create(self, model: str, messages: List[Dict[str, str]], stream: bool = False,
+                     stream_options: Optional[Dict[str, bool]] = None, **kwargs):
+        self.requests += 1
+        content = stub_translate(messages[-1]['content'])
+        usage = self._usage(messages, content)
+        if stream:
+            include_usage = bool(stream_options and stream_options.get('include_usage'))
+            return self._stream(content, usage if include_usage else None)
+
+        await asyncio.sleep(self.latency + usage.completion_tokens / self.tokens_per_second)
+        choice = SimpleNamespace(message=SimpleNamespace(role="assistant", content=content), finish_reason="stop")
+        return SimpleNamespace(choices=[choice], usage=usage, created=int(time.time()), model=model)
+
+    async def _stream(self, content: str, usage: Optional[SimpleNamespace]) -> AsyncIterator[SimpleNamespace]:
+        await asyncio.sleep(self.latency)
+        chunk_delay = self.chunk_chars / CHARS_PER_TOKEN / self.tokens_per_second
+        for start in range(0, len(content), self.chunk_chars):
+            await asyncio.sleep(chunk_delay)
+            delta = SimpleNamespace(role="assistant", content=content[start:start + self.chunk_chars])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=None)], usage=None)
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None), finish_reason="stop")],
+                              usage=None)
+        if usage is not None:
+            # With include_usage the last chunk has no choices, only the token counts
+            yield SimpleNamespace(choices=[], usage=usage)
+
+
+class StubAsyncOpenAI:
+    """Drop-in for AsyncOpenAI in translation.py, used with MBTI_TRANSLATION_BACKEND=stub."""
+
+    def __init__(self, latency: float = 0.5, tokens_per_second: float = 2000.0, chunk_chars: int = 64):
+        self.completions = StubCompletions(latency, tokens_per_second, chunk_chars)
+        self.chat = SimpleNamespace(completions=self.completions)
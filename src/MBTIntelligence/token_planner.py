@@ -0,0 +1,122 @@
+import os
+import json
+import time
+from typing import Dict, List, Optional, Tuple
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+TOKEN_USAGE_LOG = os.path.join(ROOT_DIR, "logs", "token_usage.jsonl")
+
+# Estimator parameters, tuned from the records in TOKEN_USAGE_LOG (see calibrate)
+CHARS_PER_TOKEN = 4.0  # English source text
+OUTPUT_TOKEN_RATIO = 1.6  # Hebrew output tokens per English input token
+REQUEST_OVERHEAD_TOKENS = 12  # Page delimiter and chat message framing
+
+# Output budget for one request, leaving headroom under the 16384 max_tokens limit
+DEFAULT_MAX_OUTPUT_TOKENS = 12000
+
+
+def estimate_input_tokens(text: str) -> int:
+    if not text.strip():
+        return 0
+    return int(len(text) / CHARS_PER_TOKEN) + REQUEST_OVERHEAD_TOKENS
+
+
+def estimate_output_tokens(text: str) -> int:
+    return int(estimate_input_tokens(text) * OUTPUT_TOKEN_RATIO)
+
+
+def plan_batches(pages: List[Tuple[int, str]], max_output_tokens: int = DEFAULT_MAX_OUTPUT_TOKENS,
+                 max_pages: Optional[int] = None) -> List[Dict[str, object]]:
+    """
+    Packs consecutive pages into as few requests as possible without the estimated
+    output of any request going over max_output_tokens. Empty pages are left out,
+    since they are not sent to the model.
+
+    Args:
+        pages: (page number, page text) tuples as returned by split_pages
+        max_output_tokens: Output token budget of a single request
+        max_pages: Optional cap on the number of pages in one request
+
+    Returns:
+        A list of batch dictionaries with the batch 'pages' and their estimated token counts.
+    """
+    batches = []
+    current = None
+    for page_num, page_text in pages:
+        if not page_text.strip():
+            continue
+        output_tokens = estimate_output_tokens(page_text)
+        if output_tokens > max_output_tokens:
+            print(f"Warning: page {page_num} is estimated at {output_tokens} output tokens, "
+                  f"over the {max_output_tokens} token budget.")
+        if (current is None
+                or current['estimated_output_tokens'] + output_tokens > max_output_tokens
+                or (max_pages is not None and len(current['pages']) >= max_pages)):
+            current = {'pages': [], 'estimated_input_tokens': 0, 'estimated_output_tokens': 0}
+            batches.append(current)
+        current['pages'].append((page_num, page_text))
+        current['estimated_input_tokens'] += estimate_input_tokens(page_text)
+        current['estimated_output_tokens'] += output_tokens
+    return batches
+
+
+def split_batch(batch: Dict[str, object]) -> List[Dict[str, object]]:
+    """Splits a batch of several pages into two halves, to retry a request whose output was truncated."""
+    middle = len(batch['pages']) // 2
+    return [plan_batches(pages, max(batch['estimated_output_tokens'], 1), len(pages))[0]
+            for pages in (batch['pages'][:middle], batch['pages'][middle:])]
+
+
+def record_usage(batch: Dict[str, object], usage: Dict[str, object], log_path: str = TOKEN_USAGE_LOG) -> None:
+    """
+    Appends the estimated and actual token usage of one translated batch to a JSON-lines file.
+    Responses served from the translation cache have no actual usage and are not recorded.
+    """
+    if usage.get('cached') or 'prompt_tokens' not in usage:
+        return
+    record = {
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'pages': [page_num for page_num, _ in batch['pages']],
+        'input_chars': sum(len(page_text) for _, page_text in batch['pages']),
+        'estimated_input_tokens': batch['estimated_input_tokens'],
+        'estimated_output_tokens': batch['estimated_output_tokens'],
+        'actual_input_tokens': usage['prompt_tokens'],
+        'actual_output_tokens': usage['completion_tokens'],
+        'finish_reason': usage.get('finish_reason')
+    }
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    with open(log_path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record) + '\n')
+
+
+def calibrate(log_path: str = TOKEN_USAGE_LOG) -> Dict[str, object]:
+    """
+    Computes estimator parameters from the recorded usage. The prompt token counts include
+    the system prompt, so the output ratio is taken against the estimated input instead.
+
+    Returns:
+        A dictionary with suggested 'output_token_ratio' and the mean estimation error, or
+        an empty dictionary when nothing has been recorded yet.
+    """
+    if not os.path.exists(log_path):
+        return {}
+    with open(log_path, 'r', encoding='utf-8') as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    records = [record for record in records if record['estimated_input_tokens']]
+    if not records:
+        return {}
+
+    estimated_input = sum(record['estimated_input_tokens'] for record in records)
+    actual_output = sum(record['actual_output_tokens'] for record in records)
+    errors = [(record['actual_output_tokens'] - record['estimated_output_tokens']) / record['estimated_output_tokens']
+              for record in records if record['estimated_output_tokens']]
+    return {
+        'records': len(records),
+        'output_token_ratio': actual_output / estimated_input,
+        'mean_output_estimate_error': sum(errors) / len(errors) if errors else 0.0,
+        'truncated_batches': sum(1 for record in records if record.get('finish_reason') == 'length')
+    }
+
+
+if __name__ == "__main__":
+    print(calibrate())
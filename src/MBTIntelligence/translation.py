@@ -6,10 +6,62 @@ from openai import AsyncOpenAI
 
 
 from .consts import SYSTEM_PROMPT
+from .utils import Page, split_pages, join_pages, PAGE_MARKER_PATTERN
+from .translation_cache import TranslationCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES
+from .token_planner import plan_batches, split_batch, record_usage, estimate_input_tokens, estimate_output_tokens
+from .rate_limiter import RequestScheduler
+from .stub_client import StubAsyncOpenAI
+from .metrics import metrics
 
 load_dotenv()
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
-client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+# Created by get_client on the first request, so an entry point can still choose the backend after import
+client = None
+scheduler = RequestScheduler(
+    requests_per_minute=float(os.getenv('MBTI_OPENAI_RPM', 500)),
+    tokens_per_minute=float(os.getenv('MBTI_OPENAI_TPM', 200000))
+)
+
+MODEL = "gpt-4o-mini"  # Make sure this is the correct model you want to use
+SAMPLING_PARAMS = {
+    'temperature': 0.0,
+    'top_p': 1.0,
+    'max_tokens': 16384
+}
+
+translation_cache = TranslationCache(
+    cache_dir=os.getenv('MBTI_TRANSLATION_CACHE_DIR', DEFAULT_CACHE_DIR),
+    max_bytes=int(os.getenv('MBTI_TRANSLATION_CACHE_MB', DEFAULT_MAX_BYTES // (1024 * 1024))) * 1024 * 1024,
+    bypass=os.getenv('MBTI_TRANSLATION_CACHE_BYPASS', '').lower() in ('1', 'true', 'yes')
+)
+
+
+def translation_backend():
+    """Name of the backend get_client uses, 'openai' or 'stub' (MBTI_TRANSLATION_BACKEND)."""
+    return os.getenv('MBTI_TRANSLATION_BACKEND', 'openai')
+
+
+def create_client(backend=None):
+    """Creates the API client for backend ('openai' or 'stub', defaults to MBTI_TRANSLATION_BACKEND)."""
+    backend = backend or translation_backend()
+    if backend == 'stub':
+        # Offline backend for benchmarks and demos, see stub_client.py
+        return StubAsyncOpenAI(latency=float(os.getenv('MBTI_STUB_LATENCY', 0.5)),
+                               tokens_per_second=float(os.getenv('MBTI_STUB_TOKENS_PER_SECOND', 2000)))
+    # Retries are handled by the scheduler, which also honors Retry-After across concurrent requests
+    return AsyncOpenAI(api_key=OPENAI_API_KEY, max_retries=0)
+
+
+def get_client():
+    """Returns the client shared by every request in the process, creating it on first use."""
+    global client
+    if client is None:
+        client = create_client()
+    return client
+
+
+# Maximum number of page requests in flight when translating page by page
+PAGE_CONCURRENCY = 6
 
 
 def read_text_file(file_path):
@@ -17,24 +69,60 @@ def read_text_file(file_path):
         return file.read()
 
 
-async def translate_to_hebrew(text):
+def _estimate_request_tokens(text):
+    return estimate_input_tokens(SYSTEM_PROMPT + text) + estimate_output_tokens(text)
+
+
+def _build_messages(text):
+    return [
+        {
+            "role": "system",
+            "content": SYSTEM_PROMPT
+        },
+        {
+            "role": "user",
+            "content": text
+        }
+    ]
+
+
+async def request_translation(text, use_cache=True, usage=None, page=None):
+    """
+    Sends one translation request, going through the translation cache.
+    If a usage dictionary is given it is filled with the token counts and finish reason
+    of the response, or with 'cached': True for cache hits.
+    The request is recorded as a metrics span, attributed to page if given.
+    """
+    if usage is None:
+        usage = {}
+    with metrics.span('translate_request', page, chars_in=len(text)) as span:
+        content = await _request_translation(text, use_cache, usage)
+        span.set(cache_hit=bool(usage.get('cached')), prompt_tokens=usage.get('prompt_tokens', 0),
+                 completion_tokens=usage.get('completion_tokens', 0), finish_reason=usage.get('finish_reason'),
+                 chars_out=len(content) if content is not None else 0)
+        if content is None:
+            span.status = 'error'
+    return content
+
+
+async def _request_translation(text, use_cache, usage):
     start_time = time.time()
+    cache_key = TranslationCache.make_key(text, SYSTEM_PROMPT, MODEL, SAMPLING_PARAMS, translation_backend())
+    if use_cache:
+        cached = await asyncio.get_running_loop().run_in_executor(None, translation_cache.get, cache_key)
+        if cached is not None:
+            print(f"Translation cache hit: {(time.time() - start_time) * 1000:.4f} milliseconds")
+            usage['cached'] = True
+            return cached
+    estimated_tokens = _estimate_request_tokens(text)
     try:
-        response = await client.chat.completions.create(
-            model="gpt-4o-mini",  # Make sure this is the correct model you want to use
-            messages=[
-                {
-                    "role": "system",
-                    "content": SYSTEM_PROMPT
-                },
-                {
-                    "role": "user",
-                    "content": text
-                }
-            ],
-            temperature=0.0,
-            top_p=1.0,
-            max_tokens=16384
+        response = await scheduler.run(
+            lambda: get_client().chat.completions.create(
+                model=MODEL,
+                messages=_build_messages(text),
+                **SAMPLING_PARAMS
+            ),
+            estimated_tokens
         )
         end_time = time.time()
         response_time = end_time - start_time
@@ -43,17 +131,198 @@ async def translate_to_hebrew(text):
         request_tokens = response.usage.prompt_tokens
         response_tokens = response.usage.completion_tokens
         total_tokens = response.usage.total_tokens
+        scheduler.record_usage(estimated_tokens, total_tokens)
 
         print(f"Response time: {response_time * 1000:.4f} milliseconds")
         print(f"Request tokens: {request_tokens}")
         print(f"Response tokens: {response_tokens}")
         print(f"Total tokens: {total_tokens}")
 
-        return response.choices[0].message.content
+        finish_reason = response.choices[0].finish_reason
+        usage.update(prompt_tokens=request_tokens, completion_tokens=response_tokens, finish_reason=finish_reason)
+        if finish_reason == "length":
+            # A truncated translation is missing its last lines, so it is neither cached nor used
+            print(f"Error: the response was truncated at {SAMPLING_PARAMS['max_tokens']} tokens.")
+            return None
+
+        content = response.choices[0].message.content
+        if content is not None:
+            await asyncio.get_running_loop().run_in_executor(None, translation_cache.put, cache_key, content)
+        return content
+    except Exception as e:
+        print(f"An error occurred: {str(e)}")
+        return None
+
+
+async def translate_pages_to_hebrew(text, max_concurrency=PAGE_CONCURRENCY, use_cache=True,
+                                    max_output_tokens=None):
+    """
+    Translates the "--- Page N ---" sections in separate concurrent requests, running up to
+    max_concurrency requests at once, and reassembles the pages in their original order.
+    Without max_output_tokens every page gets its own request; with it, consecutive pages are
+    packed into requests whose estimated output fits the budget (see token_planner).
+    Pages left empty by the extraction step are not sent.
+    """
+    start_time = time.time()
+    semaphore = asyncio.Semaphore(max_concurrency)
+    pages = split_pages(text)
+    if max_output_tokens is None:
+        batches = plan_batches(pages, max_pages=1)
+    else:
+        batches = plan_batches(pages, max_output_tokens)
+
+    async def translate_batch(batch):
+        page_numbers = [page_num for page_num, _ in batch['pages']]
+        usage = {}
+        async with semaphore:
+            translated = await request_translation(join_pages(batch['pages']).rstrip('\n'), use_cache, usage,
+                                                   page_numbers[0])
+        record_usage(batch, usage)
+        if translated is None:
+            if usage.get('finish_reason') == "length" and len(page_numbers) > 1:
+                print(f"Translation of pages {page_numbers} was truncated, retrying them in two requests.")
+                translated_pages = {}
+                for result in await asyncio.gather(*(translate_batch(half) for half in split_batch(batch))):
+                    translated_pages.update(result)
+                return translated_pages
+            raise ValueError(f"Translation of pages {page_numbers} failed.")
+
+        if len(page_numbers) == 1:
+            # The delimiter the model repeats is dropped; the canonical one is added back by join_pages
+            return {page_numbers[0]: PAGE_MARKER_PATTERN.sub("", translated).strip('\n')}
+        translated_pages = dict(split_pages(translated))
+        if sorted(translated_pages) != page_numbers:
+            raise ValueError(f"Translation of pages {page_numbers} returned pages {sorted(translated_pages)}.")
+        return translated_pages
+
+    try:
+        results = await asyncio.gather(*(translate_batch(batch) for batch in batches))
     except Exception as e:
         print(f"An error occurred: {str(e)}")
         return None
 
+    translated_pages = {}
+    for result in results:
+        translated_pages.update(result)
+    print(f"Translated {len(pages)} pages in {len(batches)} requests in "
+          f"{(time.time() - start_time) * 1000:.4f} milliseconds")
+    return join_pages([(page_num, translated_pages.get(page_num, "")) for page_num, _ in pages])
+
+
+async def stream_translate_to_hebrew(text, use_cache=True):
+    """
+    Translates the whole document in one streaming request and yields every page as soon
+    as the delimiter of the following page arrives, so the first pages can be written and
+    processed while the rest is still being generated.
+
+    Yields:
+        Page (page number, translated page text) tuples in document order.
+    """
+    start_time = time.time()
+    cache_key = TranslationCache.make_key(text, SYSTEM_PROMPT, MODEL, SAMPLING_PARAMS, translation_backend())
+    if use_cache:
+        cached = await asyncio.get_running_loop().run_in_executor(None, translation_cache.get, cache_key)
+        if cached is not None:
+            print(f"Translation cache hit: {(time.time() - start_time) * 1000:.4f} milliseconds")
+            metrics.record_duration('translate_stream', time.time() - start_time, cache_hit=True,
+                                    chars_in=len(text), chars_out=len(cached))
+            for page in split_pages(cached):
+                yield page
+            return
+
+    estimated_tokens = _estimate_request_tokens(text)
+    stream = await scheduler.run(
+        lambda: get_client().chat.completions.create(
+            model=MODEL,
+            messages=_build_messages(text),
+            stream=True,
+            stream_options={"include_usage": True},
+            **SAMPLING_PARAMS
+        ),
+        estimated_tokens
+    )
+
+    chunks = []
+    buffer = ""
+    pages_yielded = 0
+    usage = None
+    finish_reason = None
+    last_page_time = start_time
+    async for chunk in stream:
+        if chunk.usage is not None:
+            usage = chunk.usage
+        if chunk.choices and chunk.choices[0].finish_reason is not None:
+            finish_reason = chunk.choices[0].finish_reason
+        if not chunk.choices or not chunk.choices[0].delta.content:
+            continue
+        delta = chunk.choices[0].delta.content
+        chunks.append(delta)
+        buffer += delta
+
+        # A page is complete once the next delimiter line has fully arrived
+        markers = [match for match in PAGE_MARKER_PATTERN.finditer(buffer) if match.end() < len(buffer)]
+        for current, following in zip(markers, markers[1:]):
+            if pages_yielded == 0:
+                print(f"Time to first page: {(time.time() - start_time) * 1000:.4f} milliseconds")
+            pages_yielded += 1
+            page_text = buffer[current.end():following.start()].strip('\n')
+            # Time since the previous page arrived (or since the request for the first page)
+            now = time.time()
+            metrics.record_duration('translate_page', now - last_page_time, int(current.group(1)),
+                                    elapsed_s=round(now - start_time, 6), chars_out=len(page_text))
+            last_page_time = now
+            yield Page(int(current.group(1)), page_text)
+        if len(markers) > 1:
+            buffer = buffer[markers[-1].start():]
+
+    if finish_reason == "length":
+        # The last page is cut off, so the translation is neither cached nor finished
+        raise ValueError(f"Translation stream was truncated at {SAMPLING_PARAMS['max_tokens']} tokens.")
+    last_pages = split_pages(buffer)
+    if pages_yielded == 0 and not last_pages:
+        raise ValueError("Translation stream did not contain any page delimiters.")
+    for page in last_pages:
+        now = time.time()
+        metrics.record_duration('translate_page', now - last_page_time, page.number,
+                                elapsed_s=round(now - start_time, 6), chars_out=len(page.text))
+        last_page_time = now
+        yield page
+
+    translated_text = "".join(chunks)
+    await asyncio.get_running_loop().run_in_executor(None, translation_cache.put, cache_key, translated_text)
+    print(f"Response time: {(time.time() - start_time) * 1000:.4f} milliseconds")
+    if usage is not None:
+        scheduler.record_usage(estimated_tokens, usage.total_tokens)
+        print(f"Request tokens: {usage.prompt_tokens}")
+        print(f"Response tokens: {usage.completion_tokens}")
+        print(f"Total tokens: {usage.total_tokens}")
+    metrics.record_duration('translate_stream', time.time() - start_time, cache_hit=False, chars_in=len(text),
+                            chars_out=len(translated_text),
+                            prompt_tokens=usage.prompt_tokens if usage is not None else 0,
+                            completion_tokens=usage.completion_tokens if usage is not None else 0)
+
+
+async def translate_to_hebrew(text, by_page=False, max_concurrency=PAGE_CONCURRENCY, use_cache=True,
+                              max_output_tokens=None):
+    """
+    Translates the cleaned report text to Hebrew.
+
+    Args:
+        text: Page-structured text as written by process_pdf_file
+        by_page: Translate each page in its own concurrent request instead of one request for the whole document
+        max_concurrency: Maximum number of page requests in flight when by_page is set
+        max_output_tokens: Pack consecutive pages into concurrent requests of at most this many
+            estimated output tokens, instead of one request for the whole document
+        use_cache: Look up and store responses in the on-disk translation cache. Pass False to force a new request
+
+    Returns:
+        The translated text, or None if the translation failed.
+    """
+    if by_page or max_output_tokens is not None:
+        return await translate_pages_to_hebrew(text, max_concurrency, use_cache,
+                                               None if by_page else max_output_tokens)
+    return await request_translation(text, use_cache)
+
 
 async def main():
     file_path = r"F:\projects\MBTInteligence\MBTItxt\asaf-solomon-267149-4ae2ac9c-005e-ef11-bdfd-6045bd04b01a-cleaned.txt"
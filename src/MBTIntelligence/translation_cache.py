@@ -0,0 +1,132 @@
+import os
+import json
+import hashlib
+import threading
+from typing import Dict, Optional
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_CACHE_DIR = os.path.join(ROOT_DIR, "cache", "translations")
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+# Eviction frees space down to this share of max_bytes, so the directory scan it needs
+# runs once every many puts instead of on every put once the cache is full
+EVICTION_LOW_WATER = 0.9
+
+
+class TranslationCache:
+    """
+    Content-addressed on-disk cache for translation responses.
+
+    Each entry is a UTF-8 text file named after the hash of everything that influences
+    the response (input text, system prompt, model, sampling parameters and backend). The
+    file modification time is refreshed on every hit, so evicting the oldest files first
+    gives least-recently-used eviction once the total size goes over max_bytes.
+    The methods do blocking file I/O, so async callers run them in a thread.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 bypass: bool = False):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._size = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(text: str, system_prompt: str, model: str, params: Dict[str, object], backend: str) -> str:
+        payload = json.dumps({
+            'backend': backend,
+            'text': text,
+            'system_prompt': system_prompt,
+            'model': model,
+            'params': params
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + ".txt")
+
+    def get(self, key: str) -> Optional[str]:
+        if self.bypass:
+            return None
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def put(self, key: str, value: str) -> None:
+        path = self._entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = value.encode('utf-8')
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        with self._lock:
+            # An overwritten entry only adds the difference to the total
+            try:
+                replaced_size = os.path.getsize(path)
+            except FileNotFoundError:
+                replaced_size = 0
+            os.replace(tmp_path, path)
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(data) - replaced_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".txt"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self) -> None:
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * EVICTION_LOW_WATER
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.evictions += 1
+        self._size = total
+
+    def clear(self) -> None:
+        with self._lock:
+            for _, _, path in self._entries():
+                os.remove(path)
+            self._size = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size_bytes': self._scan_size() if self._size is None else self._size
+            }
@@ -0,0 +1,190 @@
+import re
+import json
+import hashlib
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+try:
+    from .utils import Page
+    from .consts import fixed_text_data, lines_to_keep_untranslated
+    from .translation_memory import TranslationMemory
+except ImportError:
+    from utils import Page
+    from consts import fixed_text_data, lines_to_keep_untranslated
+    from translation_memory import TranslationMemory
+
+# Words that read the same in the Hebrew report: type codes and the single preference letters
+TYPE_CODE_PATTERN = re.compile(r'^(?:[EISNTFJP]|[EI][SN][TF][JP])$')
+WORD_PATTERN = re.compile(r'[^\W\d_]+')
+
+
+def is_language_neutral(line: str) -> bool:
+    """True for lines the translation would copy unchanged: no words, or only type codes and letters."""
+    return all(TYPE_CODE_PATTERN.match(word) for word in WORD_PATTERN.findall(line))
+
+
+def deleted_fixed_text_lines() -> Dict[int, Set[int]]:
+    """
+    The lines that splice_fixed_text removes ("DELETE" in fixed_text_data), by page. Their
+    positions do not depend on the report, so placeholder info is enough to read them.
+    """
+    deleted = {}
+    for page_num, insertions in fixed_text_data(defaultdict(str), [""] * 4).items():
+        lines = {line_num for line_num, text in insertions.items() if isinstance(text, str) and "DELETE" in text}
+        if lines:
+            deleted[page_num] = lines
+    return deleted
+
+
+class LineCountMismatchError(ValueError):
+    """A translated page came back with a different number of lines than were sent for it."""
+
+    def __init__(self, page_number: int, expected: int, actual: int):
+        super().__init__(f"Page {page_number}: expected {expected} translated lines, got {actual}")
+        self.page_number = page_number
+        self.expected = expected
+        self.actual = actual
+
+
+class TranslationMask:
+    """
+    Splits the extracted pages into the lines the model has to translate and the lines that
+    can skip it: lines deleted by the fixed text, language-neutral lines, and the lines listed
+    in consts.lines_to_keep_untranslated. The skipped lines keep their source text and are put
+    back in place by merge_page, so the line numbers fixed_text_data refers to stay valid.
+
+    With a translation memory, lines it already has a translation for skip the model too and
+    are filled in with that translation. The lines the model does translate are collected by
+    merge_page and written to the memory by save_to_memory, once the translation is complete.
+    Both the lookup in the constructor and save_to_memory query SQLite, so async callers run
+    them in a thread.
+
+    Lines are numbered like fixed_text_data: by the "--- Page N ---" page number, counting
+    from 1 after the delimiter.
+    """
+
+    def __init__(self, pages: Iterable[Page], keep_config: Optional[Dict[int, Union[str, List[int]]]] = None,
+                 mask_lines: bool = True, memory: Optional[TranslationMemory] = None, memory_context: str = ""):
+        keep_config = lines_to_keep_untranslated if keep_config is None else keep_config
+        deleted = deleted_fixed_text_lines()
+        self.memory = memory
+        self.memory_context = memory_context
+        self.masks: Dict[int, List[bool]] = {}
+        self.source_lines: Dict[int, List[str]] = {}
+        # The text that replaces each skipped line: its source text, or its translation from the memory
+        self.kept_lines: Dict[int, List[str]] = {}
+        self.pages_to_translate: List[Page] = []
+        self.lines_total = 0
+        self.lines_masked = 0
+        self.chars_masked = 0
+        self.memory_segments = 0
+        self.memory_hits = 0
+        self.memory_chars = 0
+        self._translated_segments: List[Tuple[str, str]] = []
+        for page in pages:
+            lines = page.text.split('\n')
+            keep = keep_config.get(page.number, [])
+            mask = [mask_lines and (keep == "ALL" or line_num in keep or line_num in deleted.get(page.number, ())
+                                    or is_language_neutral(line))
+                    for line_num, line in enumerate(lines, start=1)]
+            self.masks[page.number] = mask
+            self.source_lines[page.number] = lines
+            self.kept_lines[page.number] = list(lines)
+            self.lines_total += len(lines)
+            self.lines_masked += sum(mask)
+            self.chars_masked += sum(len(line) for line, masked in zip(lines, mask) if masked)
+
+        if memory is not None:
+            self._fill_from_memory()
+        for page_num, mask in self.masks.items():
+            if not all(mask):
+                lines = self.source_lines[page_num]
+                self.pages_to_translate.append(
+                    Page(page_num, '\n'.join(line for line, masked in zip(lines, mask) if not masked)))
+        self._pending_masked = [page_num for page_num, mask in self.masks.items() if all(mask)]
+
+    def _fill_from_memory(self) -> None:
+        segments = [line for page_num, mask in self.masks.items()
+                    for line, masked in zip(self.source_lines[page_num], mask)
+                    if not masked and TranslationMemory.is_reusable(line)]
+        remembered = self.memory.lookup(self.memory_context, segments)
+        self.memory_segments = len(segments)
+        for page_num, mask in self.masks.items():
+            for index, line in enumerate(self.source_lines[page_num]):
+                if not mask[index] and line in remembered:
+                    mask[index] = True
+                    self.kept_lines[page_num][index] = remembered[line]
+                    self.memory_hits += 1
+                    self.memory_chars += len(line)
+
+    def _source_page(self, page_num: int) -> Page:
+        return Page(page_num, '\n'.join(self.kept_lines[page_num]).strip('\n'))
+
+    def unmasked_page(self, page_num: int) -> Page:
+        """The full source text of a page, every line included, to translate it without the mask."""
+        return Page(page_num, '\n'.join(self.source_lines[page_num]))
+
+    def merge_page(self, translated: Page, unmasked: bool = False) -> List[Page]:
+        """
+        Puts the skipped lines back into a translated page. Returns it together with the fully
+        skipped pages that come before it and were not returned yet, in page order.
+
+        Args:
+            translated: The translation of the page's unmasked lines
+            unmasked: The translation is of the whole page (see unmasked_page) and is used as it is
+
+        Raises:
+            LineCountMismatchError: If the translation does not have one line for every line sent,
+                so the skipped lines cannot be put back in place. Nothing is returned for the page
+                then; callers translate unmasked_page instead and merge it with unmasked=True.
+        """
+        mask = self.masks.get(translated.number)
+        translated_lines = translated.text.split('\n')
+        if mask is not None and not unmasked and len(translated_lines) != mask.count(False):
+            raise LineCountMismatchError(translated.number, mask.count(False), len(translated_lines))
+
+        result = [self._source_page(page_num) for page_num in self._pending_masked if page_num < translated.number]
+        self._pending_masked = [page_num for page_num in self._pending_masked if page_num > translated.number]
+        if mask is None or unmasked:
+            result.append(translated)
+            return result
+        if self.memory is not None:
+            sent_lines = [line for line, masked in zip(self.source_lines[translated.number], mask) if not masked]
+            self._translated_segments.extend(zip(sent_lines, translated_lines))
+        remaining = iter(translated_lines)
+        merged = [line if masked else next(remaining) for line, masked in zip(self.kept_lines[translated.number], mask)]
+        result.append(Page(translated.number, '\n'.join(merged)))
+        return result
+
+    def save_to_memory(self) -> None:
+        """Adds the lines translated by the model so far to the translation memory."""
+        if self.memory is not None and self._translated_segments:
+            self.memory.add(self.memory_context, self._translated_segments)
+        self._translated_segments = []
+
+    def remaining_pages(self) -> List[Page]:
+        """The fully skipped pages after the last translated page."""
+        result = [self._source_page(page_num) for page_num in self._pending_masked]
+        self._pending_masked = []
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'lines_total': self.lines_total,
+            'lines_masked': self.lines_masked,
+            'chars_masked': self.chars_masked,
+            'pages_skipped': sum(1 for mask in self.masks.values() if all(mask)),
+            'memory_segments': self.memory_segments,
+            'memory_hits': self.memory_hits,
+            'memory_chars': self.memory_chars
+        }
+
+
+def mask_config_hash() -> str:
+    """Hash of everything that decides which lines are masked, for the translation checkpoint key."""
+    payload = json.dumps({
+        'keep': lines_to_keep_untranslated,
+        'deleted': {page_num: sorted(lines) for page_num, lines in deleted_fixed_text_lines().items()},
+        'type_codes': TYPE_CODE_PATTERN.pattern
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
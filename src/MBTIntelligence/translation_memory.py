@@ -0,0 +1,161 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from typing import Dict, Iterable, Tuple
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_MEMORY_PATH = os.path.join(ROOT_DIR, "cache", "translation_memory.sqlite3")
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+# Typographic characters the extraction returns inconsistently between report versions
+PUNCTUATION_VARIANTS = str.maketrans({'‘': "'", '’': "'", '“': '"', '”': '"',
+                                      '–': '-', '—': '-', '…': '...'})
+# Segments shorter than this are too ambiguous out of context to reuse
+MIN_SEGMENT_CHARS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    context TEXT NOT NULL,
+    source TEXT NOT NULL,
+    normalized TEXT NOT NULL,
+    translation TEXT NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (context, source)
+);
+CREATE INDEX IF NOT EXISTS segments_normalized ON segments (context, normalized);
+"""
+
+
+def normalize_segment(text: str) -> str:
+    """The form segments are matched by when there is no exact match: case, spacing and quotes ignored."""
+    text = unicodedata.normalize('NFKC', text).translate(PUNCTUATION_VARIANTS)
+    return WHITESPACE_PATTERN.sub(' ', text).strip().casefold()
+
+
+class TranslationMemory:
+    """
+    SQLite store of source line -> translated line pairs from past translations, shared by all
+    reports. Step II reports repeat the same facet descriptions word for word, so once a line
+    has been translated it can be filled in from here instead of being sent to the model again.
+
+    Lines are matched exactly first, then by their normalized form (see normalize_segment).
+    Entries are scoped by a context hash of the prompt, model, sampling parameters and
+    translation backend, so changing any of them starts a fresh memory without deleting the
+    old one, and stub translations never fill in a real report.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_MEMORY_PATH, disabled: bool = False):
+        self.db_path = db_path
+        self.disabled = disabled
+        self.hits = 0
+        self.misses = 0
+        self.added = 0
+        self._connection = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_context(system_prompt: str, model: str, params: Dict[str, object], backend: str) -> str:
+        payload = json.dumps({
+            'backend': backend,
+            'system_prompt': system_prompt,
+            'model': model,
+            'params': params
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def is_reusable(segment: str) -> bool:
+        return len(segment.strip()) >= MIN_SEGMENT_CHARS
+
+    def _connect(self) -> sqlite3.Connection:
+        # Callers hold self._lock; one connection is shared by the threads of the process
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            connection = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            # WAL lets batch runs in other processes read while one of them writes
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    def lookup(self, context: str, segments: Iterable[str]) -> Dict[str, str]:
+        """Returns the stored translation of every segment that has one, by segment."""
+        if self.disabled:
+            return {}
+        segments = {segment for segment in segments if self.is_reusable(segment)}
+        found = {}
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                for segment in segments:
+                    row = connection.execute(
+                        "SELECT source, translation FROM segments WHERE context = ? AND source = ?",
+                        (context, segment)).fetchone()
+                    if row is None:
+                        row = connection.execute(
+                            "SELECT source, translation FROM segments WHERE context = ? AND normalized = ? "
+                            "ORDER BY hits DESC LIMIT 1", (context, normalize_segment(segment))).fetchone()
+                    if row is None:
+                        continue
+                    found[segment] = row[1]
+                    connection.execute("UPDATE segments SET hits = hits + 1, last_used = ? "
+                                       "WHERE context = ? AND source = ?", (now, context, row[0]))
+            self.hits += len(found)
+            self.misses += len(segments) - len(found)
+        return found
+
+    def add(self, context: str, pairs: Iterable[Tuple[str, str]]) -> None:
+        """
+        Stores source -> translation pairs. A segment that is already stored takes the new
+        translation when it differs, so a corrected prompt or model output replaces the old one.
+        """
+        if self.disabled:
+            return
+        now = time.time()
+        rows = [(context, source, normalize_segment(source), translation, now, now)
+                for source, translation in pairs if self.is_reusable(source) and translation.strip()]
+        if not rows:
+            return
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                before = connection.total_changes
+                connection.executemany(
+                    "INSERT INTO segments (context, source, normalized, translation, created, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (context, source) DO UPDATE SET "
+                    "translation = excluded.translation, last_used = excluded.last_used "
+                    "WHERE translation != excluded.translation", rows)
+                self.added += connection.total_changes - before
+
+    def clear(self) -> None:
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("DELETE FROM segments")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            segments = 0
+            if not self.disabled and os.path.exists(self.db_path):
+                segments = self._connect().execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'added': self.added,
+                'segments': segments
+            }
+
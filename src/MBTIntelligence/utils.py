@@ -1,46 +1,73 @@
 import re
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, NamedTuple, Tuple, Union
 
 try:
-    from .consts import MBTI_TYPES, MBTI_QUALITIES, MBTI_TYPE_QUALITIES, MBTI_QUALITIES_HEBREW
+    from .consts import MBTI_TYPES, MBTI_TYPE_QUALITIES, MBTI_QUALITIES_HEBREW
+    from .report_document import ReportDocument
 except ImportError:
-    from consts import MBTI_TYPES, MBTI_QUALITIES, MBTI_TYPE_QUALITIES, MBTI_QUALITIES_HEBREW
+    from consts import MBTI_TYPES, MBTI_TYPE_QUALITIES, MBTI_QUALITIES_HEBREW
+    from report_document import ReportDocument
 
 
-def find_type(file_path: str) -> Optional[str]:
-    with open(file_path, 'r', encoding='utf-8') as file:
-        content = file.read()
-    for mbti_type in MBTI_TYPES:
-        if mbti_type in content:
-            return mbti_type
-    return None
+class Page(NamedTuple):
+    """One page of a page-structured report: its 1-based number and text without the delimiter line."""
+    number: int
+    text: str
 
 
-def get_name(file_path: str) -> Optional[str]:
-    with open(file_path, 'r', encoding='utf-8') as file:
-        file.readline()
-        second_line = file.readline().strip()
-        return second_line if second_line else None
+# Matches the "--- Page N ---" delimiter lines, including the lowercase form the model sometimes returns
+PAGE_MARKER_PATTERN = re.compile(r'^[ \t]*---[ \t]*[Pp]age[ \t]+(\d+)[ \t]*---[ \t]*$', re.MULTILINE)
 
 
-def get_date(file_path: str) -> Optional[str]:
-    with open(file_path, 'r', encoding='utf-8') as file:
-        content = file.read()
+def split_pages(text: str) -> List[Page]:
+    """
+    Splits page-structured text on its "--- Page N ---" delimiters.
+
+    Returns:
+        A list of Page (page number, page text) tuples in document order. Text before the
+        first delimiter is ignored and leading/trailing empty lines of each page are dropped.
+    """
+    matches = list(PAGE_MARKER_PATTERN.finditer(text))
+    pages = []
+    for index, match in enumerate(matches):
+        end = matches[index + 1].start() if index + 1 < len(matches) else len(text)
+        pages.append(Page(int(match.group(1)), text[match.end():end].strip('\n')))
+    return pages
+
+
+def join_pages(pages: List[Tuple[int, str]]) -> str:
+    """
+    Reassembles (page number, page text) tuples into the "--- Page N ---" layout
+    written by process_pdf_file.
+    """
+    parts = []
+    for page_num, page_text in pages:
+        parts.append(f"--- Page {page_num} ---\n")
+        parts.append(f"{page_text}\n\n" if page_text else "\n")
+    return "".join(parts)
+
+
+def as_document(source: Union[str, ReportDocument]) -> ReportDocument:
+    """Returns source itself if it already is a ReportDocument, otherwise loads the file at that path."""
+    if isinstance(source, ReportDocument):
+        return source
+    return ReportDocument.from_file(source)
 
-    # Hebrew date pattern: day month year
-    hebrew_date_pattern = r'\d{1,2}\s+ב?[א-ת]+\s+\d{4}'
 
-    date_match = re.search(hebrew_date_pattern, content)
-    return date_match.group() if date_match else None
+def find_type(file_path: Union[str, ReportDocument]) -> Optional[str]:
+    return as_document(file_path).type
 
 
-def get_all_info(file_path: str) -> Dict[str, Optional[str]]:
-    info = {
-        'name': get_name(file_path),
-        'date': get_date(file_path),
-        'type': find_type(file_path)
-    }
-    return info
+def get_name(file_path: Union[str, ReportDocument]) -> Optional[str]:
+    return as_document(file_path).name
+
+
+def get_date(file_path: Union[str, ReportDocument]) -> Optional[str]:
+    return as_document(file_path).date
+
+
+def get_all_info(file_path: Union[str, ReportDocument]) -> Dict[str, Optional[str]]:
+    return as_document(file_path).info()
 
 
 def format_mbti_string(mbti_qualities: Dict[str, int]) -> str:
@@ -56,24 +83,8 @@ def format_mbti_string(mbti_qualities: Dict[str, int]) -> str:
     return " | ".join(formatted_items)
 
 
-def extract_mbti_qualities_scores(file_path: str) -> Dict[str, int]:
-    qualities_scores = {quality: 0 for quality in MBTI_QUALITIES}
-    mbti_type = find_type(file_path)
-    print(qualities_scores)
-    if mbti_type:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            content = file.read()
-
-        # Pattern to match a line with מוחצנות or מופנמות and extract all numbers
-        pattern = r'(מוחצנות|מופנמות).*?(\d+).*?(\d+).*?(\d+).*?(\d+)'
-        match = re.search(pattern, content, re.DOTALL)
-
-        if match:
-            qualities = ['Extraversion', 'Sensing', 'Thinking', 'Judging']
-            for i, quality in enumerate(qualities):
-                qualities_scores[quality] = int(match.group(i + 2))
-
-    return qualities_scores
+def extract_mbti_qualities_scores(file_path: Union[str, ReportDocument]) -> Dict[str, int]:
+    return as_document(file_path).qualities_scores()
 
 
 def collect_preferred_qualities(file_path: str) -> List[str]:
@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'benchmarks')))
+from MBTIntelligence.extract_backends import BACKENDS, ExtractionBackend, available_backends, check_conformance
+from MBTIntelligence.consts import lines_to_remove
+
+
+@pytest.fixture(scope="module")
+def reports(tmp_path_factory):
+    pytest.importorskip("reportlab")
+    from synthetic_reports import make_step2_reports
+    return make_step2_reports(str(tmp_path_factory.mktemp("reports")), 3)
+
+
+@pytest.mark.parametrize("name", sorted(BACKENDS))
+def test_backend_conforms_to_pypdf2(name, reports):
+    if name not in available_backends():
+        pytest.skip(f"{BACKENDS[name].module} is not installed")
+    for report in reports:
+        assert check_conformance(name, report, lines_to_remove) == []
+
+
+def test_backends_implement_every_method():
+    with pytest.raises(TypeError):
+        ExtractionBackend()
+    for backend in BACKENDS.values():
+        backend()
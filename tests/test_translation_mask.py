@@ -0,0 +1,61 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from MBTIntelligence.translation_mask import TranslationMask, LineCountMismatchError
+from MBTIntelligence.translation_memory import TranslationMemory
+from MBTIntelligence.utils import Page
+
+# Page numbers past the end of a report, so no fixed text lines are deleted from them
+PAGES = [
+    Page(101, "You prefer to plan ahead.\nESTJ\nYou enjoy meeting new people."),
+    Page(102, "E\nI"),
+    Page(103, "Header kept as is\nYou like clear structure.")
+]
+KEEP_CONFIG = {103: [1]}
+
+
+def test_mask_sends_only_the_lines_to_translate():
+    mask = TranslationMask(PAGES, keep_config=KEEP_CONFIG)
+
+    assert mask.pages_to_translate == [Page(101, "You prefer to plan ahead.\nYou enjoy meeting new people."),
+                                       Page(103, "You like clear structure.")]
+    assert mask.stats()['lines_masked'] == 4
+    assert mask.stats()['pages_skipped'] == 1
+
+
+def test_merge_page_puts_the_masked_lines_back():
+    mask = TranslationMask(PAGES, keep_config=KEEP_CONFIG)
+
+    assert mask.merge_page(Page(101, "A\nB")) == [Page(101, "A\nESTJ\nB")]
+    # The fully masked page 102 comes out before the next translated page
+    assert mask.merge_page(Page(103, "C")) == [Page(102, "E\nI"), Page(103, "Header kept as is\nC")]
+    assert mask.remaining_pages() == []
+
+
+def test_merge_page_rejects_a_line_count_mismatch():
+    mask = TranslationMask(PAGES, keep_config=KEEP_CONFIG)
+
+    with pytest.raises(LineCountMismatchError) as error:
+        mask.merge_page(Page(101, "A\nB\nC"))
+    assert (error.value.page_number, error.value.expected, error.value.actual) == (101, 2, 3)
+
+    # The page translated again without the mask is used as it is
+    assert mask.unmasked_page(101) == PAGES[0]
+    assert mask.merge_page(Page(101, "A\nB\nC"), unmasked=True) == [Page(101, "A\nB\nC")]
+    assert mask.remaining_pages() == [Page(102, "E\nI")]
+
+
+def test_memory_fills_in_known_lines(tmp_path):
+    memory = TranslationMemory(str(tmp_path / "memory.sqlite3"))
+    mask = TranslationMask(PAGES, keep_config=KEEP_CONFIG, memory=memory, memory_context="test")
+    mask.merge_page(Page(101, "A\nB"))
+    mask.save_to_memory()
+
+    mask = TranslationMask(PAGES, keep_config=KEEP_CONFIG, memory=memory, memory_context="test")
+    assert mask.memory_hits == 2
+    assert mask.pages_to_translate == [Page(103, "You like clear structure.")]
+    assert mask.remaining_pages() == [Page(101, "A\nESTJ\nB"), Page(102, "E\nI")]
+    memory.close()